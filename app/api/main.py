@@ -6,20 +6,28 @@ from app.common.logger import Logger
 from app.common.constants import API_PREFIX
 
 
-API_DIRECTORY = "app/api"
+API_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+API_PACKAGE = "app.api"
+
+# generated by `python manage.py routes`, imported on startup instead of walking API_DIRECTORY
+ROUTE_MANIFEST_PATH = os.path.join(API_DIRECTORY, "routes.py")
 
 logger = Logger(__name__);
 
 def add_api_routes(app: FastAPI):
-    add_api_routes_from_directory(app, API_PREFIX)
-    return app
+    # imported here so a stale manifest can still be regenerated with this module
+    from app.api.routes import ROUTES
 
-def add_api_routes_from_directory(app: FastAPI, prefix: str):
-    api_dir_path = os.path.abspath(API_DIRECTORY)
+    for router, prefix in ROUTES:
+        app.include_router(router, prefix=prefix)
+    return app
 
-    for folder, _, files in os.walk(api_dir_path):
+def discover_api_routes(prefix: str = API_PREFIX) -> list[tuple[str, str]]:
+    """(module path, prefix) of the router modules below API_DIRECTORY, the folders make up the prefix."""
+    routes = []
+    for folder, _, files in os.walk(API_DIRECTORY):
 
-        relative_path = os.path.relpath(folder, api_dir_path)
+        relative_path = os.path.relpath(folder, API_DIRECTORY)
         api_prefix =  relative_path.replace(os.sep, "/")
 
         if not api_prefix.startswith("/"):
@@ -28,11 +36,39 @@ def add_api_routes_from_directory(app: FastAPI, prefix: str):
         api_prefix = api_prefix.replace("_", "-")
 
         for file in files:
-            if file.endswith(".py") and file != "__init__.py" and file != "main.py":
+            if file.endswith(".py") and file not in ("__init__.py", "main.py", "routes.py"):
                 module_name = os.path.splitext(file)[0]
-
-                module_path= f'app.api{(folder.split(f"app/api")[-1]).replace(os.sep, ".")}.{module_name}'
+                package = API_PACKAGE if relative_path == "." else f"{API_PACKAGE}.{relative_path.replace(os.sep, '.')}"
+                module_path = f"{package}.{module_name}"
                 module = importlib.import_module(module_path)
 
                 if hasattr(module, "router"):
-                    app.include_router(module.router, prefix=api_prefix)
+                    routes.append((module_path, api_prefix))
+    return sorted(routes)
+
+def render_route_manifest(routes: list[tuple[str, str]]) -> str:
+    aliases = {module_path: module_path.removeprefix(f"{API_PACKAGE}.").replace(".", "_") for module_path, _ in routes}
+
+    lines = [
+        '"""Generated by `python manage.py routes` from the modules under app/api, do not edit."""',
+        *[f"import {module_path} as {aliases[module_path]}" for module_path, _ in routes],
+        "",
+        "",
+        "ROUTES = [",
+        *[f'    ({aliases[module_path]}.router, "{api_prefix}"),' for module_path, api_prefix in routes],
+        "]",
+        "",
+    ]
+    return "\n".join(lines)
+
+def write_route_manifest() -> str:
+    manifest = render_route_manifest(discover_api_routes())
+    with open(ROUTE_MANIFEST_PATH, "w") as f:
+        f.write(manifest)
+    return ROUTE_MANIFEST_PATH
+
+def is_route_manifest_current() -> bool:
+    if not os.path.exists(ROUTE_MANIFEST_PATH):
+        return False
+    with open(ROUTE_MANIFEST_PATH) as f:
+        return f.read() == render_route_manifest(discover_api_routes())
@@ -0,0 +1,15 @@
+"""Generated by `python manage.py routes` from the modules under app/api, do not edit."""
+import app.api.v1.health as v1_health
+import app.api.v1.metrics as v1_metrics
+import app.api.v1.permissions.permission_management as v1_permissions_permission_management
+import app.api.v1.roles.user_role_management as v1_roles_user_role_management
+import app.api.v1.users.user_management as v1_users_user_management
+
+
+ROUTES = [
+    (v1_health.router, "/api/v1"),
+    (v1_metrics.router, "/api/v1"),
+    (v1_permissions_permission_management.router, "/api/v1/permissions"),
+    (v1_roles_user_role_management.router, "/api/v1/roles"),
+    (v1_users_user_management.router, "/api/v1/users"),
+]
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, Request
+
+from app.common.auth.token import authenticate, get_token, validate_permissions
+from app.common.auth.token_cache import token_cache
+from app.common.constants import Permissions
+from app.connectors.cache.redis import get_redis_connector
+from app.connectors.db.postgres import get_pool_stats
+
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+@router.get("/db-pool", description="Live statistics of the postgres connection pool of this worker")
+@authenticate
+@validate_permissions(allowed_permissions=[Permissions.READ_METRICS])
+async def db_pool_metrics(request: Request, token = Depends(get_token)):
+    return get_pool_stats()
+
+
+@router.get("/token-cache", description="Hit and miss counters of the verified token cache of this worker")
+@authenticate
+@validate_permissions(allowed_permissions=[Permissions.READ_METRICS])
+async def token_cache_metrics(request: Request, token = Depends(get_token)):
+    return token_cache.stats()
+
+
+@router.get("/redis-pool", description="Connection usage of the redis pool of this worker")
+@authenticate
+@validate_permissions(allowed_permissions=[Permissions.READ_METRICS])
+async def redis_pool_metrics(request: Request, token = Depends(get_token)):
+    return get_redis_connector().get_pool_stats()
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Body, Depends, HTTPException, Request
 from fastapi.responses import JSONResponse
 from app.common.auth.token import authenticate, get_token, validate_permissions
+from app.common.cache.response_cache import cached_response
+from app.common.constants import CountStrategy, Permissions
 from app.connectors.db.postgres import SessionDep
 from app.exceptions.database_exceptions import DbException
 from app.models.requests.schema import UserPermissionCreateRequest, UserPermissionUpdateRequest
@@ -11,11 +13,24 @@ router = APIRouter(tags=["Permissions"])
 
 @router.get("")
 @authenticate
-@validate_permissions(allowed_permissions=[1])
-async def get_permissions(db: SessionDep, request: Request, token = Depends(get_token), page_num: int = 1, page_size: int = 10):
+@validate_permissions(allowed_permissions=[Permissions.READ_PERMISSION])
+@cached_response(tags=["permissions"])
+async def get_permissions(db: SessionDep, request: Request, token = Depends(get_token), page_num: int = 1, page_size: int = 10, cursor: str | None = None, count_strategy: CountStrategy | None = None):
     try:
-        permissions, total_count = await user_permission_service.get_all_permissions(db=db, page_num=page_num, page_size=page_size)
-        return JSONResponse(content=UserPermissionListResponse(permissions=permissions, total_count=total_count, page_size=page_size, page_num=page_num).model_dump(), status_code=200)
+        page = await user_permission_service.get_all_permissions(db=db, page_num=page_num, page_size=page_size, cursor=cursor, count_strategy=count_strategy)
+        return JSONResponse(
+            content=UserPermissionListResponse(
+                permissions=page.items,
+                total_count=page.total_count,
+                total_pages=page.get_total_pages(page_size),
+                page_size=page_size,
+                page_num=None if cursor else page_num,
+                next_cursor=page.next_cursor,
+                has_more=page.has_more,
+                count_strategy=page.count_strategy,
+            ).model_dump(),
+            status_code=200
+        )
     except DbException as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -24,7 +39,7 @@ async def get_permissions(db: SessionDep, request: Request, token = Depends(get_
 
 @router.post("")
 @authenticate
-@validate_permissions(allowed_permissions=[1])
+@validate_permissions(allowed_permissions=[Permissions.CREATE_PERMISSION])
 async def create_permission(db: SessionDep, request: Request, token = Depends(get_token), create_permission_request: UserPermissionCreateRequest = Body(...)):
     try:
         permission = await user_permission_service.create_permission(db=db, permission=create_permission_request)
@@ -37,7 +52,8 @@ async def create_permission(db: SessionDep, request: Request, token = Depends(ge
 
 @router.get("/{permission_id}")
 @authenticate
-@validate_permissions(allowed_permissions=[1])
+@validate_permissions(allowed_permissions=[Permissions.READ_PERMISSION])
+@cached_response(tags=["permissions"])
 async def get_permission(db: SessionDep, request: Request, permission_id: int, token = Depends(get_token)):
     try:
         permission = await user_permission_service.get_permission_by_id(db=db, permission_id=permission_id)
@@ -48,7 +64,7 @@ async def get_permission(db: SessionDep, request: Request, permission_id: int, t
 
 @router.put("/{permission_id}")
 @authenticate
-@validate_permissions(allowed_permissions=[1])
+@validate_permissions(allowed_permissions=[Permissions.UPDATE_PERMISSION])
 async def update_permission(db: SessionDep, request: Request, permission_id: int, token = Depends(get_token), update_permission_request: UserPermissionUpdateRequest = Body(...)):
     try:
         permission = await user_permission_service.update_permission(db=db, permission_id=permission_id, permission=update_permission_request)
@@ -61,7 +77,7 @@ async def update_permission(db: SessionDep, request: Request, permission_id: int
 
 @router.delete("/{permission_id}")
 @authenticate
-@validate_permissions(allowed_permissions=[1])
+@validate_permissions(allowed_permissions=[Permissions.DELETE_PERMISSION])
 async def delete_permission(db: SessionDep, request: Request, permission_id: int, token = Depends(get_token)):
     try:
         await user_permission_service.delete_permission(db=db, permission_id=permission_id)
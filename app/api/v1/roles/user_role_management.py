@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import JSONResponse
-from sqlmodel import Session
 
 from app.common.auth.token import authenticate, get_token
+from app.common.cache.response_cache import cached_response
 from app.connectors.db.postgres import SessionDep
 from app.models.requests.schema import CreateUserRoleRequest
 from app.services import user_role_service
@@ -14,9 +14,10 @@ router = APIRouter(tags=["Roles"])
 
 @router.get("", description="Get all user roles")
 @authenticate
+@cached_response(tags=["roles"])
 async def get_user_roles(db: SessionDep,request: Request, token = Depends(get_token)):
     try:
-        user_roles = user_role_service.get_all_user_roles(db=db)
+        user_roles = await user_role_service.get_all_user_roles(db=db)
         return JSONResponse(content={"user_roles": [user_role.dict() for user_role in user_roles]}, status_code=200)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -33,6 +34,7 @@ async def create_user_role(request: Request, user_role_request: CreateUserRoleRe
 
 @router.get("/{user_role_id}")
 @authenticate
+@cached_response(tags=["roles"])
 async def get_user_role(request: Request, user_role_id: int, token = Depends(get_token),db: SessionDep = SessionDep):
     try:
         user_role = await user_role_service.get_user_role(db=db, user_role_id=user_role_id)
@@ -64,6 +66,7 @@ async def delete_user_role(request: Request, user_role_id: int, token = Depends(
 
 @router.get("/{user_role_id}/permissions")
 @authenticate
+@cached_response(tags=["roles", "permissions"])
 async def get_user_role_permissions(request: Request, user_role_id: int, token = Depends(get_token),db: SessionDep = SessionDep):
     try:
         permissions = await user_role_service.get_user_role_permissions(db=db, user_role_id=user_role_id)
@@ -3,12 +3,15 @@ from fastapi import APIRouter, Body, Depends, Request
 from fastapi.responses import JSONResponse
 
 from app.common.auth.token import authenticate, create_auth_token, get_token, validate_permissions, verify_token
+from app.common.cache.response_cache import cached_response
+from app.common.streaming import RequestBodyStreamingResponse, to_ndjson
 from app.connectors.db.postgres import SessionDep
 from app.exceptions.database_exceptions import DbException
 from app.models.requests.schema import CreateUserRequest, LoginRequest, UpdatePasswordRequest, UpdateUserProfileRequest
 from app.models.responses.schema import SelfUserProfileResponse, UserProfileResponse
 from app.models.db.schema import User
-from app.services import user_profile_service, user_service
+from app.services import user_import_service, user_profile_service, user_service
+from app.common.constants import CountStrategy, Permissions, UserImportFormat
 from app.common.logger import Logger
 
 
@@ -20,7 +23,7 @@ logger = Logger(__name__)
 async def sign_up(db: SessionDep, create_user_request: CreateUserRequest = Body(...)):
     try:
         user = await user_service.create_user(db=db, create_user_request=create_user_request)
-        token = create_auth_token(user=user)
+        token = await create_auth_token(db=db, user=user)
         return JSONResponse(content={"user": user.model_dump(), "token": token}, status_code=200)
     
     except DbException:
@@ -35,7 +38,7 @@ async def sign_up(db: SessionDep, create_user_request: CreateUserRequest = Body(
 async def login(db: SessionDep, login_request: LoginRequest = Body(...)):
     try:
         user = await user_service.login_user(db=db,login_request=login_request)
-        token = create_auth_token(user=user)
+        token = await create_auth_token(db=db, user=user)
         return JSONResponse(content={"token": token}, status_code=200)
     except Exception as ex:
         logger.error(f"error occurred while adding user :  {str(ex)}")
@@ -58,7 +61,7 @@ async def logout(token = Depends(get_token)):
         logger.error(f"error occurred while adding user :  {str(ex)}")
 
 
-@router.get("/search", description="Search users by name for email", tags=["Users"])
+@router.get("/search", description="Search users by name for email, pass next_cursor back as cursor to get the next page", tags=["Users"])
 @authenticate
 async def search_users(db: SessionDep,
                  request : Request,
@@ -67,25 +70,45 @@ async def search_users(db: SessionDep,
                  page_size: int | None = 10,
                  page_num: int | None = 1,
                  sort_dir: str | None = "asc",
-                 sort_column: str | None = "id"):
+                 sort_column: str | None = None,
+                 cursor: str | None = None,
+                 count_strategy: CountStrategy | None = None):
     try:
-        total, users = await user_service.list_users(
-            db=db, q=q, sort_dir=sort_dir, sort_column=sort_column, page_num=page_num, page_size=page_size)
-        return JSONResponse(
-            content={
-                "results": users,
-                "page_num": page_num,
-                "page_size": page_size,
-                "total_pages": (total//page_size) + 1
-            },
-            status_code=200
-        )
+        page = await user_service.list_users(
+            db=db, q=q, sort_dir=sort_dir, sort_column=sort_column, page_num=page_num, page_size=page_size, cursor=cursor, count_strategy=count_strategy)
+        content = {
+            "results": page.items,
+            "page_size": page_size,
+            "next_cursor": page.next_cursor,
+            "has_more": page.has_more,
+            "total_pages": page.get_total_pages(page_size),
+            "count_strategy": page.count_strategy.value,
+        }
+        if not cursor:
+            content["page_num"] = page_num
+        return JSONResponse(content=content, status_code=200)
+    except DbException as ex:
+        return JSONResponse(content={"errors": str(ex)}, status_code=400)
     except Exception as ex:
         logger.error("Error occurred while fetching the user list")
 
 
+@router.post("/import", description="Bulk create users from an NDJSON or CSV body, streams the result of every chunk as NDJSON", tags=["Users"])
+@authenticate
+@validate_permissions(allowed_permissions=[Permissions.CREATE_USER])
+async def import_users(request: Request, format: UserImportFormat | None = None, token = Depends(get_token)):
+    import_format = format or user_import_service.get_import_format(request.headers.get("content-type"))
+    logger.info(f"user {request.state.user['id']} started a {import_format.value} user import")
+    # the users are written by the service with their own connections, the body is read while the result streams
+    return RequestBodyStreamingResponse(
+        to_ndjson(user_import_service.import_users(request.stream(), import_format)),
+        media_type="application/x-ndjson",
+    )
+
+
 @router.get("/profile/me", responses={"200": {"model": SelfUserProfileResponse}}, tags=["Users"])
 @authenticate
+@cached_response(tags=["profile:{user_id}", "user:{user_id}"], vary_on_user=True)
 async def get_self_user_profile(db: SessionDep,request: Request, token = Depends(verify_token)):
     try:
         user_data = await user_service.get_user(db=db, user_id=request.state.user["id"])
@@ -111,6 +134,7 @@ async def get_self_user_profile(db: SessionDep,request: Request, token = Depends
 
 @router.get("/profile/{user_id}", responses={"200": {"model": UserProfileResponse}}, tags=["User Profile"])
 @authenticate
+@cached_response(tags=["profile:{user_id}"])
 async def get_user_profile(db: SessionDep,user_id: int,request: Request, token = Depends(verify_token)):
     try:
         user_profile = await user_profile_service.get_user_profile(db=db, user_id=user_id)
@@ -124,7 +148,7 @@ async def get_user_profile(db: SessionDep,user_id: int,request: Request, token =
 
 @router.patch("/{user_id}/update/role/{role_id}", tags=["Roles"])
 @authenticate
-@validate_permissions(allowed_permissions=[1])
+@validate_permissions(allowed_permissions=[Permissions.UPDATE_USER])
 async def update_user_role(db: SessionDep, request: Request, user_id: int, role_id: int, token = Depends(get_token)):
     try:
         user_data = await user_service.update_user_role(db=db, user_id=user_id, role_id=role_id)
@@ -0,0 +1,106 @@
+import asyncio
+import time
+from typing import Iterable
+from sqlmodel import select
+
+from app.common.logger import Logger
+from app.connectors.cache.redis import get_redis_connector
+from app.connectors.cache.subscriptions import get_redis_subscriber
+from app.connectors.db.postgres import async_session_maker
+from app.models.db.schema import Permission, UserRole, UserRolePermissionLink
+
+logger = Logger(__name__)
+
+ROLE_PERMISSIONS_CHANNEL = "role-permissions"
+
+# a name or role the index does not know reloads it at most this often, in seconds
+RELOAD_ON_MISS_INTERVAL = 5
+
+
+def get_permission_mask(permission_ids: Iterable[int]) -> int:
+    """One bit per permission id, so checking a permission is a single AND."""
+    mask = 0
+    for permission_id in permission_ids:
+        mask |= 1 << permission_id
+    return mask
+
+
+class RolePermissionIndex:
+    """In memory copy of the role permissions, reloaded whole and swapped in one go on every change."""
+
+    def __init__(self) -> None:
+        # permission name -> permission id
+        self.permission_ids: dict[str, int] = {}
+        # role id -> bitmask of the role's permission ids
+        self.role_masks: dict[int, int] = {}
+        self.loaded = False
+        self.miss_reload: asyncio.Future | None = None
+        self.miss_reloaded_at = 0.0
+
+    async def reload(self):
+        async with async_session_maker() as session:
+            permissions = (await session.exec(select(Permission.id, Permission.permission_name))).all()
+            role_ids = (await session.exec(select(UserRole.id))).all()
+            links = (await session.exec(select(UserRolePermissionLink.role_id, UserRolePermissionLink.permission_id))).all()
+
+        role_masks = {role_id: 0 for role_id in role_ids}
+        for role_id, permission_id in links:
+            role_masks[role_id] = role_masks.get(role_id, 0) | (1 << permission_id)
+
+        self.permission_ids = {permission_name: permission_id for permission_id, permission_name in permissions}
+        self.role_masks = role_masks
+        self.loaded = True
+        logger.info(f"loaded permissions of {len(role_masks)} roles")
+
+    def knows(self, role_id: int, permission_names: Iterable[str]) -> bool:
+        return role_id in self.role_masks and all(permission_name in self.permission_ids for permission_name in permission_names)
+
+    async def reload_on_miss(self):
+        """Reload for a role or permission created on another worker, shared by the requests missing meanwhile."""
+        if self.miss_reload is None or (self.miss_reload.done() and time.monotonic() - self.miss_reloaded_at >= RELOAD_ON_MISS_INTERVAL):
+            self.miss_reloaded_at = time.monotonic()
+            self.miss_reload = asyncio.ensure_future(self.reload())
+        try:
+            await asyncio.shield(self.miss_reload)
+        except Exception as ex:
+            logger.error(f"error occurred while reloading role permissions : {str(ex)}")
+
+    def get_role_mask(self, role_id: int) -> int | None:
+        return self.role_masks.get(role_id)
+
+    def get_permissions_mask(self, permission_names: Iterable[str]) -> int:
+        return get_permission_mask(
+            self.permission_ids[permission_name]
+            for permission_name in permission_names
+            if permission_name in self.permission_ids
+        )
+
+
+permission_index = RolePermissionIndex()
+
+# keeps a reference to reloads started from pub/sub messages until they finish
+reload_tasks: set[asyncio.Task] = set()
+
+
+def schedule_reload(*_):
+    task = asyncio.create_task(permission_index.reload())
+    reload_tasks.add(task)
+    task.add_done_callback(reload_tasks.discard)
+
+
+def register_permission_index_listener():
+    redis_subscriber = get_redis_subscriber()
+    redis_subscriber.subscribe(ROLE_PERMISSIONS_CHANNEL, schedule_reload)
+    redis_subscriber.on_reconnect(schedule_reload)
+
+
+async def role_permissions_changed():
+    """Reloads the index here and on every other worker after a committed change, never raises."""
+    try:
+        await permission_index.reload()
+    except Exception as ex:
+        logger.error(f"error occurred while reloading role permissions : {str(ex)}")
+    try:
+        await get_redis_connector().publish(ROLE_PERMISSIONS_CHANNEL, {})
+    except Exception as ex:
+        logger.error(f"error occurred while broadcasting role permission change : {str(ex)}")
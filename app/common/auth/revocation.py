@@ -0,0 +1,144 @@
+import math
+import time
+
+from app.common.auth.token_cache import token_cache
+from app.common.logger import Logger
+from app.connectors.cache.redis import get_redis_connector
+from app.connectors.cache.subscriptions import get_redis_subscriber
+
+logger = Logger(__name__)
+
+REVOCATION_CHANNEL = "token-revocations"
+USER_ROLE_CHANNEL = "user-role-changes"
+
+
+class RevokedTokenSet:
+    """Digests of revoked tokens known to this worker, each kept until the token expires."""
+
+    # expired entries are swept once this many revocations were added since the last sweep
+    SWEEP_INTERVAL = 1024
+
+    def __init__(self) -> None:
+        self.entries: dict[str, float] = {}
+        self.added_since_sweep = 0
+
+    def add(self, key: str, expires_at: float):
+        self.entries[key] = expires_at
+        self.added_since_sweep += 1
+        if self.added_since_sweep >= self.SWEEP_INTERVAL:
+            self.sweep()
+
+    def contains(self, key: str) -> bool:
+        expires_at = self.entries.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= time.time():
+            del self.entries[key]
+            return False
+        return True
+
+    def sweep(self):
+        current_time = time.time()
+        self.entries = {key: expires_at for key, expires_at in self.entries.items() if expires_at > current_time}
+        self.added_since_sweep = 0
+
+
+revoked_tokens = RevokedTokenSet()
+
+
+class UserRoleChanges:
+    """Current role of users whose role changed while they may still hold tokens issued for the old one."""
+
+    def __init__(self) -> None:
+        # user id -> (role id, expires_at)
+        self.entries: dict[int, tuple[int, float]] = {}
+
+    def add(self, user_id: int, role_id: int, expires_at: float):
+        entry = self.entries.get(user_id)
+        if entry is not None and entry[0] == role_id:
+            expires_at = max(expires_at, entry[1])
+        self.entries[user_id] = (role_id, expires_at)
+
+    def get(self, user_id: int) -> int | None:
+        entry = self.entries.get(user_id)
+        if entry is None:
+            return None
+        if entry[1] <= time.time():
+            del self.entries[user_id]
+            return None
+        return entry[0]
+
+
+user_role_changes = UserRoleChanges()
+
+
+def on_revocation_message(message: dict):
+    revoked_tokens.add(message["key"], message["expires_at"])
+    token_cache.invalidate(message["key"])
+
+
+def on_user_role_message(message: dict):
+    user_role_changes.add(message["user_id"], message["role_id"], message["expires_at"])
+
+
+def on_reconnect():
+    # every token is checked against redis again on its next use
+    token_cache.clear()
+
+
+def register_revocation_listener():
+    redis_subscriber = get_redis_subscriber()
+    redis_subscriber.subscribe(REVOCATION_CHANNEL, on_revocation_message)
+    redis_subscriber.subscribe(USER_ROLE_CHANNEL, on_user_role_message)
+    redis_subscriber.on_reconnect(on_reconnect)
+
+
+def get_revocation_key(payload: dict, key: str) -> str:
+    # tokens issued before jti was added are identified by their digest instead
+    return f"revoked:{payload.get('jti') or key}"
+
+
+def get_user_role_key(user_id: int) -> str:
+    return f"user-role:{user_id}"
+
+
+async def is_revoked_in_redis(key: str, payload: dict) -> bool:
+    """Revocation and role change lookup for a token this worker has not seen yet, in one round trip."""
+    user_id = int(payload["sub"])
+    revocation_key, user_role_key = get_revocation_key(payload, key), get_user_role_key(user_id)
+    values = await get_redis_connector().read_many([revocation_key, user_role_key], encrypted=False)
+
+    if values[user_role_key] is not None:
+        user_role_changes.add(user_id, int(values[user_role_key]), payload["exp"])
+    if values[revocation_key] is None:
+        return False
+    revoked_tokens.add(key, payload["exp"])
+    return True
+
+
+async def revoke_token(token: str, payload: dict):
+    key = token_cache.digest(token)
+    expires_at = payload["exp"]
+    # the marker only has to outlive the token, after that the token is rejected as expired
+    ttl = max(1, math.ceil(expires_at - time.time()))
+
+    revoked_tokens.add(key, expires_at)
+    token_cache.invalidate(key)
+
+    # store and broadcast in a single round trip
+    async with get_redis_connector().pipeline() as pipe:
+        pipe.write(get_revocation_key(payload, key), 1, ttl=ttl, encrypt=False)
+        pipe.publish(REVOCATION_CHANNEL, {"key": key, "expires_at": expires_at})
+
+
+async def record_user_role_change(user_id: int, role_id: int, expires_at: float):
+    """Overrides the role of the user's outstanding tokens, on this worker and every other one."""
+    user_role_changes.add(user_id, role_id, expires_at)
+    ttl = max(1, math.ceil(expires_at - time.time()))
+
+    try:
+        async with get_redis_connector().pipeline() as pipe:
+            pipe.write(get_user_role_key(user_id), role_id, ttl=ttl, encrypt=False)
+            pipe.publish(USER_ROLE_CHANNEL, {"user_id": user_id, "role_id": role_id, "expires_at": expires_at})
+    except Exception as ex:
+        logger.error(f"error occurred while broadcasting the role change of user {user_id} : {str(ex)}")
@@ -1,16 +1,24 @@
 # Dummy token validator
 from functools import wraps
 import time
+import uuid
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from jose import JWTError, jwt
+from jose import ExpiredSignatureError, JWTError, jwt
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.common.auth.permission_index import get_permission_mask, permission_index
+from app.common.auth.revocation import is_revoked_in_redis, record_user_role_change, revoked_tokens, user_role_changes
+from app.common.auth.token_cache import token_cache
 from app.common.configuration import config
-from app.connectors.cache.redis import get_redis_connector
 from app.models.db.schema import User
+from app.services import user_role_service
 
 token_auth_scheme = HTTPBearer()
 token_algoritm = 'HS256'
+token_required_claims = {"require_sub": True, "require_iat": True, "require_exp": True, "require_jti": True}
+
+TOKEN_LIFETIME = 14 * 24 * 60 * 60
 
 
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(token_auth_scheme)):
@@ -22,17 +30,40 @@ def get_token(credentials: HTTPAuthorizationCredentials = Depends(token_auth_sch
     return token
 
 
-def create_auth_token(user: User):
-    return encrypt_token({"user": user.model_dump(),
-                  "expires_at": time.time() + (14 * 24 * 60 * 60)})
+async def create_auth_token(db: AsyncSession, user: User):
+    issued_at = int(time.time())
+    permission_mask = permission_index.get_role_mask(user.role_id)
+    if permission_mask is None:
+        permission_ids = await user_role_service.get_user_role_permission_ids(db=db, user_role_id=user.role_id)
+        permission_mask = get_permission_mask(permission_ids)
+    return encrypt_token({"sub": str(user.id),
+                  "iat": issued_at,
+                  "exp": issued_at + TOKEN_LIFETIME,
+                  "jti": uuid.uuid4().hex,
+                  "role": user.role_id,
+                  "perms": permission_mask})
 
 def verify_jwt_token(token : str) : 
-    decoded = decode_jwt_token(token=token)
-    current_time = time.time()
+    try:
+        return decode_jwt_token(token=token)
+    except JWTError:
+        return None
+
+
+def get_token_user(payload: dict) -> dict:
+    """The claims the routes read from request.state.user, with the user's current role."""
+    user_id = int(payload["sub"])
+    role_id = user_role_changes.get(user_id)
+    if role_id is None or role_id == payload["role"]:
+        return {"id": user_id, "role_id": payload["role"], "permissions": payload["perms"]}
+    # the mask in the token belongs to the old role, the new one is only resolved through the index
+    return {"id": user_id, "role_id": role_id, "permissions": 0}
+
 
-    if current_time < decoded["expires_at"]:
-        return decoded
-    return None
+async def user_role_changed(user_id: int, role_id: int):
+    """Call after a committed role change, tokens issued before it are authorized with the new role."""
+    # tokens issued from now on carry the new role, older ones are expired after TOKEN_LIFETIME
+    await record_user_role_change(user_id, role_id, time.time() + TOKEN_LIFETIME)
 
 
 def encrypt_token(token_data: any):
@@ -40,7 +71,38 @@ def encrypt_token(token_data: any):
 
 
 def decode_jwt_token(token: str):
-    return jwt.decode(token, config.JWT_TOKEN_SECRET, algorithms=[token_algoritm])
+    # exp is verified by jose, a token missing any of the claims is rejected as invalid
+    return jwt.decode(token, config.JWT_TOKEN_SECRET, algorithms=[token_algoritm], options=token_required_claims)
+
+
+def get_verified_payload(token: str, key: str = None):
+    """Decoded payload of a token with a valid signature, from the token cache when possible. Says nothing about revocation."""
+    payload = token_cache.get(key or token_cache.digest(token))
+    if payload is None:
+        payload = decode_jwt_token(token)
+    return payload
+
+
+async def get_authenticated_payload(token: str, verified_payload: dict = None):
+    """Decoded payload of a valid and not revoked token, verified_payload is one decoded earlier in the request."""
+    key = token_cache.digest(token)
+    if revoked_tokens.contains(key):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
+
+    payload = token_cache.get(key)
+    if payload is not None:
+        return payload
+
+    try:
+        payload = verified_payload or decode_jwt_token(token)
+    except ExpiredSignatureError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
+
+    if await is_revoked_in_redis(key=key, payload=payload):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
+
+    token_cache.put(key, payload, payload["exp"])
+    return payload
 
 
 def authenticate(func):
@@ -62,20 +124,13 @@ def authenticate(func):
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing or invalid Authorization header")
 
         token = auth_header.split(" ")[1]
+        # decoded by the rate limiter when it keyed the request by user
+        verified_token = getattr(request.state, "verified_token", None)
+        verified_payload = verified_token[1] if verified_token and verified_token[0] == token else None
         try:
-            payload = decode_jwt_token(token)
+            payload = await get_authenticated_payload(token, verified_payload)
             # Optionally, you can attach payload to request.state for downstream use
-            expires_at = payload["expires_at"]
-            if expires_at < time.time():
-                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
-            
-            redis_connector = get_redis_connector()
-            expired_token = await redis_connector.read(token)
-
-            if expired_token is not None:
-                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
-            
-            request.state.user = payload["user"]
+            request.state.user = get_token_user(payload)
         except JWTError:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
@@ -83,7 +138,8 @@ def authenticate(func):
     return wrapper
 
 
-def validate_permissions(allowed_permissions: list[int]):
+def validate_permissions(allowed_permissions: list[str]):
+    """Lets the request through when the user's role grants any of the allowed permissions."""
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
@@ -98,7 +154,17 @@ def validate_permissions(allowed_permissions: list[int]):
             if not request:
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Request object not found")
 
-            if request.state.user["role_id"] not in allowed_permissions:
+            role_id = request.state.user["role_id"]
+            if not permission_index.knows(role_id, allowed_permissions):
+                await permission_index.reload_on_miss()
+            if not permission_index.loaded:
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Permissions are not available")
+
+            role_mask = permission_index.get_role_mask(role_id)
+            if role_mask is None:
+                role_mask = request.state.user["permissions"]
+
+            if not role_mask & permission_index.get_permissions_mask(allowed_permissions):
                 raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="You are not authorized to access this resource")
 
 
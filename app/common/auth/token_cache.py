@@ -0,0 +1,57 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+from app.common.configuration import config
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of verified token payloads, keyed by digest(token) and kept until the token expires."""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        # digest -> (payload, expires_at)
+        self.entries: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> dict | None:
+        entry = self.entries.get(key)
+        if entry is None or entry[1] <= time.time():
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: str, payload: dict, expires_at: float):
+        self.entries[key] = (payload, expires_at)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, key: str):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+token_cache = VerifiedTokenCache(max_size=config.TOKEN_CACHE_MAX_SIZE)
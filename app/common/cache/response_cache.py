@@ -0,0 +1,234 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import NamedTuple
+from fastapi import HTTPException, Request, status
+from fastapi.responses import Response
+
+from app.common.configuration import config
+from app.common.logger import Logger
+from app.connectors.cache.redis import get_redis_connector
+from app.connectors.cache.subscriptions import get_redis_subscriber
+
+logger = Logger(__name__)
+
+RESPONSE_CACHE_CHANNEL = "response-cache"
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    status_code: int
+    media_type: str
+    etag: str
+
+    def to_response(self) -> Response:
+        return Response(content=self.body, status_code=self.status_code, media_type=self.media_type, headers=get_etag_headers(self.etag))
+
+
+def get_etag(body: bytes) -> str:
+    """Strong etag of a serialized body, identical bodies get identical etags on every worker."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def get_etag_headers(etag: str) -> dict:
+    # clients may keep the body but have to revalidate it before every use
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=get_etag_headers(etag))
+
+
+class LocalResponseCache:
+    """Per worker LRU in front of redis, entries expire with the same ttl as in redis."""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        # key -> (response, expires_at, tags)
+        self.entries: OrderedDict[str, tuple[CachedResponse, float, list[str]]] = OrderedDict()
+        self.tags: dict[str, set[str]] = {}
+
+    def get(self, key: str) -> CachedResponse | None:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.time():
+            self.remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def set(self, key: str, response: CachedResponse, expires_at: float, tags: list[str]):
+        self.remove(key)
+        self.entries[key] = (response, expires_at, tags)
+        for tag in tags:
+            self.tags.setdefault(tag, set()).add(key)
+        if len(self.entries) > self.max_size:
+            self.remove(next(iter(self.entries)))
+
+    def remove(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+
+    def invalidate_tags(self, tags: list[str]):
+        for tag in tags:
+            for key in list(self.tags.get(tag, ())):
+                self.remove(key)
+
+    def clear(self):
+        self.entries.clear()
+        self.tags.clear()
+
+
+local_response_cache = LocalResponseCache(max_size=config.RESPONSE_CACHE_LOCAL_MAX_SIZE)
+
+
+def get_tag_key(tag: str) -> str:
+    return f"response-tag:{tag}"
+
+
+def serialize_cached_response(response: CachedResponse, ttl: int, tags: list[str]) -> bytes:
+    """A json header line followed by the body as is."""
+    header = {"status_code": response.status_code, "media_type": response.media_type, "etag": response.etag, "ttl": ttl, "tags": tags}
+    # json.dumps escapes newlines, the first one ends the header
+    return json.dumps(header, separators=(",", ":")).encode("utf-8") + b"\n" + response.body
+
+
+def deserialize_cached_response(value: bytes) -> tuple[CachedResponse, dict]:
+    header, _, body = value.partition(b"\n")
+    header = json.loads(header)
+    return CachedResponse(body=body, status_code=header["status_code"], media_type=header["media_type"], etag=header["etag"]), header
+
+
+async def read_cached_response(key: str) -> CachedResponse | None:
+    response = local_response_cache.get(key)
+    if response is not None:
+        return response
+
+    try:
+        value = await get_redis_connector().read(key, encrypted=False)
+    except Exception as ex:
+        logger.warning(f"response cache could not reach redis : {str(ex)}")
+        return None
+    if value is None:
+        return None
+
+    try:
+        response, header = deserialize_cached_response(value)
+    except (ValueError, KeyError):
+        # written in an older format, it is replaced on the next write
+        return None
+    # the remaining ttl is unknown here, keep it locally for at most the configured ttl
+    local_response_cache.set(key, response, time.time() + header["ttl"], header["tags"])
+    return response
+
+
+async def write_cached_response(key: str, response: CachedResponse, ttl: int, tags: list[str]):
+    local_response_cache.set(key, response, time.time() + ttl, tags)
+    try:
+        async with get_redis_connector().pipeline() as pipe:
+            pipe.write(key, serialize_cached_response(response, ttl, tags), ttl=ttl, encrypt=False)
+            for tag in tags:
+                pipe.add_to_set(get_tag_key(tag), key, ttl=ttl)
+    except Exception as ex:
+        logger.warning(f"response cache could not reach redis : {str(ex)}")
+
+
+async def invalidate_tags(tags: list[str]):
+    """Drop every cached response carrying any of the tags, in redis and on every worker."""
+    local_response_cache.invalidate_tags(tags)
+    try:
+        redis_connector = get_redis_connector()
+        tag_keys = [get_tag_key(tag) for tag in tags]
+        # SUNION for the keys and a pipeline for the rest
+        keys = await redis_connector.get_set_union(tag_keys)
+        async with redis_connector.pipeline() as pipe:
+            pipe.delete(*keys, *tag_keys)
+            pipe.publish(RESPONSE_CACHE_CHANNEL, {"tags": tags})
+    except Exception as ex:
+        logger.error(f"error occurred while invalidating cached responses for {tags} : {str(ex)}")
+
+
+def on_response_cache_message(message: dict):
+    local_response_cache.invalidate_tags(message["tags"])
+
+
+def register_response_cache_listener():
+    redis_subscriber = get_redis_subscriber()
+    redis_subscriber.subscribe(RESPONSE_CACHE_CHANNEL, on_response_cache_message)
+    redis_subscriber.on_reconnect(local_response_cache.clear)
+
+
+def get_cache_key(request: Request, vary_on_user: bool) -> str:
+    key = request.url.path
+    if request.url.query:
+        key += "?" + "&".join(sorted(request.url.query.split("&")))
+    if vary_on_user:
+        key += f"|user:{request.state.user['id']}"
+    return "response:" + hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def cached_response(ttl: int = None, tags: list[str] = None, vary_on_user: bool = False):
+    """
+    Caches successful responses in process and in redis and answers a matching If-None-Match with a 304.
+    Tags like "profile:{user_id}" are formatted with the route's arguments, place it below @authenticate.
+    """
+    ttl = ttl or config.RESPONSE_CACHE_TTL
+    tags = tags or []
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            # Find the request object in args or kwargs
+            request: Request = None
+            for arg in args:
+                if isinstance(arg, Request):
+                    request = arg
+                    break
+            if not request:
+                request = kwargs.get("request")
+            if not request:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Request object not found")
+
+            if_none_match = request.headers.get("If-None-Match")
+            key = get_cache_key(request, vary_on_user)
+            cached = await read_cached_response(key)
+            if cached is not None:
+                if etag_matches(if_none_match, cached.etag):
+                    return not_modified(cached.etag)
+                return cached.to_response()
+
+            response = await func(*args, **kwargs)
+            if not isinstance(response, Response) or response.status_code != 200:
+                return response
+
+            body = bytes(response.body)
+            cached = CachedResponse(body=body, status_code=response.status_code, media_type=response.media_type, etag=get_etag(body))
+            user = getattr(request.state, "user", None) or {}
+            tag_arguments = {"user_id": user.get("id"), **kwargs}
+            await write_cached_response(key, cached, ttl=ttl, tags=[tag.format(**tag_arguments) for tag in tags])
+
+            if etag_matches(if_none_match, cached.etag):
+                return not_modified(cached.etag)
+            response.headers.update(get_etag_headers(cached.etag))
+            return response
+        return wrapper
+    return decorator
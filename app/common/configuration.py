@@ -5,16 +5,40 @@ class Configuration(BaseSettings):
     APP_PORT : int = None
     APP_ENV : str = 'dev'
     JWT_TOKEN_SECRET : str = None
+    TOKEN_CACHE_MAX_SIZE : int = 10000
 
     DB_USER :str = None
     DB_PASSWORD :str = None
     DB_HOST :str = None
     DB_POST: int = None
     DB_NAME : str = None
+    DB_POOL_SIZE : int = 5
+    DB_MAX_OVERFLOW : int = 10
+    DB_POOL_TIMEOUT : float = 30
+    DB_POOL_RECYCLE : int = 1800
+    DB_POOL_PRE_PING : bool = True
 
     REDIS_HOST : str  =None
     REDIS_PORT : str = None
     REDIS_KEY : str = None
+    REDIS_DB : int = 0
+    REDIS_MAX_CONNECTIONS : int = 50
+    REDIS_POOL_TIMEOUT : float = 5
+    REDIS_SOCKET_TIMEOUT : float = 5
+    REDIS_SOCKET_CONNECT_TIMEOUT : float = 2
+    REDIS_SOCKET_KEEPALIVE : bool = True
+    REDIS_HEALTH_CHECK_INTERVAL : int = 30
+
+    RATE_LIMIT_BACKEND : str = 'memory'
+    RATE_LIMIT_MAX_TRACKED_KEYS : int = 100000
+
+    RESPONSE_CACHE_TTL : int = 300
+    RESPONSE_CACHE_LOCAL_MAX_SIZE : int = 1000
+
+    PAGINATION_COUNT_STRATEGY : str = 'exact'
+    PAGINATION_COUNT_CACHE_TTL : int = 60
+
+    USER_IMPORT_CHUNK_SIZE : int = 1000
 
     class Config:
         env_file = ".env"
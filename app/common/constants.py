@@ -4,6 +4,7 @@ from enum import Enum
 
 APP_NAME = "FastAPI Boilerplate"
 APP_DESCRIPTION = "FastAPI Boilerplate"
+APP_VERSION = "1.0.0"
 
 API_PREFIX = "/api"
 
@@ -18,3 +19,34 @@ class UserSignUpVerificationStatus(int,Enum):
     PENDING = 0
     VERIFIED = 1
     EXPIRED = 2
+
+
+class Permissions(str,Enum):
+    """Names of the permissions created by seed_permissions."""
+    CREATE_USER = "create_user"
+    READ_USER = "read_user"
+    UPDATE_USER = "update_user"
+    DELETE_USER = "delete_user"
+    CREATE_USER_ROLE = "create_user_role"
+    READ_USER_ROLE = "read_user_role"
+    UPDATE_USER_ROLE = "update_user_role"
+    DELETE_USER_ROLE = "delete_user_role"
+    CREATE_PERMISSION = "create_permission"
+    READ_PERMISSION = "read_permission"
+    UPDATE_PERMISSION = "update_permission"
+    DELETE_PERMISSION = "delete_permission"
+    READ_METRICS = "read_metrics"
+
+
+class CountStrategy(str,Enum):
+    """How paginated endpoints work out the total number of rows."""
+    EXACT = "exact"
+    ESTIMATED = "estimated"
+    CACHED = "cached"
+    NONE = "none"
+
+
+class UserImportFormat(str,Enum):
+    """Body formats accepted by the bulk user import."""
+    NDJSON = "ndjson"
+    CSV = "csv"
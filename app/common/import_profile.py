@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import NamedTuple
+
+
+class ImportTime(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def profile_imports(module: str = "main") -> list[ImportTime]:
+    """Imports module in a fresh interpreter with -X importtime and parses its report."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=os.getcwd(),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed :\n{result.stderr[-2000:]}")
+
+    import_times = []
+    for line in result.stderr.splitlines():
+        # import time:       412 |        893 |   jose.jwt
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        if not self_us.strip().isdigit():
+            # the header line
+            continue
+        import_times.append(ImportTime(module=name.strip(), self_us=int(self_us), cumulative_us=int(cumulative_us)))
+    return import_times
+
+
+def get_package_times(import_times: list[ImportTime]) -> dict[str, int]:
+    """Self time summed per top level package, e.g. everything under jose or Crypto."""
+    package_times = defaultdict(int)
+    for import_time in import_times:
+        package_times[import_time.module.split(".")[0]] += import_time.self_us
+    return dict(package_times)
@@ -0,0 +1,97 @@
+import gzip
+import json
+from fastapi import FastAPI, Request
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
+from fastapi.openapi.utils import get_openapi
+from fastapi.responses import Response
+
+from app.common.cache.response_cache import etag_matches, get_etag
+from app.common.constants import APP_DESCRIPTION, APP_NAME, APP_VERSION
+from app.common.logger import Logger
+
+logger = Logger(__name__)
+
+OPENAPI_URL = "/openapi.json"
+DOCS_URL = "/docs"
+REDOC_URL = "/redoc"
+
+
+def accepts_encoding(accept_encoding: str | None, encoding: str) -> bool:
+    """Whether the Accept-Encoding header allows encoding, by its own q-value or the one of *."""
+    qualities = {}
+    for entry in (accept_encoding or "").split(","):
+        name, *params = [part.strip() for part in entry.split(";")]
+        if not name:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.lower()] = quality
+    return qualities.get(encoding, qualities.get("*", 0.0)) > 0
+
+
+class OpenApiDocument:
+    """The OpenAPI schema, generated on first use and kept serialized and gzip compressed."""
+
+    def __init__(self, app: FastAPI) -> None:
+        self.app = app
+        self.body: bytes = None
+        self.gzip_body: bytes = None
+        self.etag: str = None
+        self.gzip_etag: str = None
+
+    def get_schema(self) -> dict:
+        if self.app.openapi_schema is None:
+            self.app.openapi_schema = get_openapi(title=APP_NAME, description=APP_DESCRIPTION, version=APP_VERSION, routes=self.app.routes)
+        return self.app.openapi_schema
+
+    def build(self):
+        if self.body is not None:
+            return
+        body = json.dumps(self.get_schema(), separators=(",", ":")).encode("utf-8")
+        self.gzip_body = gzip.compress(body, compresslevel=9)
+        self.etag = get_etag(body)
+        # a strong validator is per content coding
+        self.gzip_etag = self.etag[:-1] + '-gzip"'
+        self.body = body
+        logger.info(f"generated openapi schema, {len(self.body)} bytes, {len(self.gzip_body)} gzip compressed")
+
+    def get_response(self, request: Request) -> Response:
+        self.build()
+        use_gzip = accepts_encoding(request.headers.get("Accept-Encoding"), "gzip")
+        etag = self.gzip_etag if use_gzip else self.etag
+        headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            return Response(status_code=304, headers=headers)
+        if use_gzip:
+            return Response(content=self.gzip_body, media_type="application/json", headers={**headers, "Content-Encoding": "gzip"})
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+    def write(self, path: str, indent: int = 2):
+        with open(path, "w") as f:
+            f.write(json.dumps(self.get_schema(), indent=indent))
+
+
+def configure_openapi(app: FastAPI):
+    """Serves the schema and the docs pages, for an app created with openapi_url=None."""
+    document = OpenApiDocument(app)
+    app.openapi = document.get_schema
+
+    async def openapi(request: Request):
+        return document.get_response(request)
+
+    async def swagger_ui(request: Request):
+        return get_swagger_ui_html(openapi_url=OPENAPI_URL, title=f"{APP_NAME} - Swagger UI")
+
+    async def redoc(request: Request):
+        return get_redoc_html(openapi_url=OPENAPI_URL, title=f"{APP_NAME} - ReDoc")
+
+    app.add_route(OPENAPI_URL, openapi, include_in_schema=False)
+    app.add_route(DOCS_URL, swagger_ui, include_in_schema=False)
+    app.add_route(REDOC_URL, redoc, include_in_schema=False)
+    return app
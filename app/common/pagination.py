@@ -0,0 +1,160 @@
+import base64
+import hashlib
+import json
+import math
+from datetime import datetime
+from typing import Any, List, NamedTuple, Tuple
+from sqlalchemy import DateTime, func, select, text, tuple_
+from sqlalchemy.dialects import postgresql
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.common.configuration import config
+from app.common.constants import CountStrategy
+from app.common.logger import Logger
+from app.connectors.cache.redis import get_redis_connector
+from app.connectors.db.explain import get_plan
+from app.exceptions.database_exceptions import DbException
+
+logger = Logger(__name__)
+
+
+SORT_DIRECTIONS = ("asc", "desc")
+
+
+def get_query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()[:16]
+
+
+def encode_cursor(sort_column: str, sort_dir: str, value: Any, id: int, query: str = "") -> str:
+    """Opaque token for the row after the given sort value and id, bound to the ordering and search term."""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({"c": sort_column, "d": sort_dir, "q": get_query_hash(query), "v": value, "id": id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_column: str, sort_dir: str, column, query: str = "") -> Tuple[Any, int]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        value, id = payload["v"], int(payload["id"])
+        if payload["c"] != sort_column or payload["d"] != sort_dir:
+            raise ValueError("cursor was issued for a different sort order")
+        if payload.get("q") != get_query_hash(query):
+            raise ValueError("cursor was issued for a different search")
+        if value is not None and isinstance(column.type, DateTime):
+            value = datetime.fromisoformat(value)
+    except (ValueError, KeyError, TypeError) as ex:
+        raise DbException(f"invalid cursor : {str(ex)}")
+    return value, id
+
+
+def get_sort_direction(sort_dir: str) -> str:
+    sort_dir = (sort_dir or "asc").lower()
+    if sort_dir not in SORT_DIRECTIONS:
+        raise DbException(f"invalid sort direction {sort_dir}, expected one of {list(SORT_DIRECTIONS)}")
+    return sort_dir
+
+
+def order_by_keyset(statement, column, id_column, sort_dir: str):
+    """Orders by the sort column with the id as tie breaker, so every row has a stable position."""
+    if column is id_column:
+        return statement.order_by(id_column.desc() if sort_dir == "desc" else id_column.asc())
+    if sort_dir == "desc":
+        return statement.order_by(column.desc(), id_column.desc())
+    return statement.order_by(column.asc(), id_column.asc())
+
+
+def seek(statement, column, id_column, sort_dir: str, cursor: str, sort_column: str, query: str = ""):
+    """Continues after the cursor with WHERE (col, id) > (:value, :id)."""
+    value, id = decode_cursor(cursor, sort_column, sort_dir, column, query)
+    if column is id_column:
+        condition = id_column < id if sort_dir == "desc" else id_column > id
+    elif sort_dir == "desc":
+        condition = tuple_(column, id_column) < tuple_(value, id)
+    else:
+        condition = tuple_(column, id_column) > tuple_(value, id)
+    return statement.where(condition)
+
+
+def get_next_cursor(rows: List[Any], page_size: int, sort_column: str, sort_dir: str, query: str = "") -> str | None:
+    """Cursor after the page from up to page_size + 1 rows, None on the last page."""
+    if len(rows) <= page_size:
+        return None
+    last_row = rows[page_size - 1]
+    return encode_cursor(sort_column, sort_dir, getattr(last_row, sort_column), last_row.id, query)
+
+
+class Page(NamedTuple):
+    items: List[Any]
+    total_count: int | None
+    next_cursor: str | None
+    has_more: bool
+    count_strategy: CountStrategy
+
+    def get_total_pages(self, page_size: int) -> int | None:
+        if self.total_count is None:
+            return None
+        return max(math.ceil(self.total_count / page_size), 1)
+
+
+def get_count_strategy(count_strategy: CountStrategy | str | None, cursor: str | None = None) -> CountStrategy:
+    """An explicit strategy wins, otherwise cursor pages skip the count and offset pages use the configured one."""
+    if count_strategy:
+        return CountStrategy(count_strategy)
+    if cursor:
+        return CountStrategy.NONE
+    return CountStrategy(config.PAGINATION_COUNT_STRATEGY)
+
+
+async def count_exact(db: AsyncSession, statement) -> int:
+    return (await db.exec(select(func.count()).select_from(statement.order_by(None).subquery()))).scalar_one()
+
+
+async def count_estimated(db: AsyncSession, statement) -> int:
+    """pg_class.reltuples or the plan's row estimate, an exact count for a table never analyzed."""
+    if statement.whereclause is None:
+        table_name = statement.get_final_froms()[0].name
+        estimate = (await db.exec(text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)").bindparams(table_name=table_name))).scalar_one_or_none()
+    else:
+        plan = await get_plan(await db.connection(), statement.order_by(None))
+        estimate = plan["Plan Rows"]
+
+    if estimate is None or estimate < 0:
+        return await count_exact(db, statement)
+    return int(estimate)
+
+
+def get_count_cache_key(statement) -> str:
+    compiled = statement.order_by(None).compile(dialect=postgresql.dialect())
+    key = str(compiled) + json.dumps(compiled.params, sort_keys=True, default=str)
+    return "count:" + hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+async def count_cached(db: AsyncSession, statement) -> int:
+    """Exact count shared by all workers for PAGINATION_COUNT_CACHE_TTL seconds."""
+    key = get_count_cache_key(statement)
+    redis_connector = get_redis_connector()
+    try:
+        count = await redis_connector.read(key, encrypted=False)
+        if count is not None:
+            return int(count)
+    except Exception as ex:
+        logger.warning(f"count cache could not reach redis : {str(ex)}")
+
+    count = await count_exact(db, statement)
+    try:
+        await redis_connector.write(key, count, ttl=config.PAGINATION_COUNT_CACHE_TTL, encrypt=False)
+    except Exception as ex:
+        logger.warning(f"count cache could not reach redis : {str(ex)}")
+    return count
+
+
+async def count_rows(db: AsyncSession, statement, count_strategy: CountStrategy) -> int | None:
+    """Total rows matched by statement, None for CountStrategy.NONE."""
+    if count_strategy == CountStrategy.EXACT:
+        return await count_exact(db, statement)
+    if count_strategy == CountStrategy.ESTIMATED:
+        return await count_estimated(db, statement)
+    if count_strategy == CountStrategy.CACHED:
+        return await count_cached(db, statement)
+    return None
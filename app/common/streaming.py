@@ -0,0 +1,18 @@
+import json
+from typing import Any, AsyncIterator
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+
+async def to_ndjson(items: AsyncIterator[dict[str, Any]]) -> AsyncIterator[bytes]:
+    async for item in items:
+        yield json.dumps(item, separators=(",", ":"), default=str).encode("utf-8") + b"\n"
+
+
+class RequestBodyStreamingResponse(StreamingResponse):
+    """StreamingResponse that does not call receive(), for content produced while the request body is read."""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
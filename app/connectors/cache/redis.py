@@ -1,24 +1,89 @@
-from redis.asyncio import Redis
+from redis.asyncio import BlockingConnectionPool, Redis
+from redis.utils import HIREDIS_AVAILABLE
 from app.common.configuration import config
+from app.common.logger import Logger
 from Crypto.Cipher import AES
 import base64
 import json
+from contextlib import asynccontextmanager
+
+logger = Logger(__name__)
 
 redis_connector = None
 
 def get_redis_connector():
     global redis_connector
     if redis_connector is None:
-        redis_connector = RedisConnector(host=config.REDIS_HOST, port=config.REDIS_PORT, prefix="fastapi")
+        redis_connector = RedisConnector(host=config.REDIS_HOST, port=config.REDIS_PORT, db=config.REDIS_DB, prefix="fastapi")
     return redis_connector
 
+
+class InstrumentedConnectionPool(BlockingConnectionPool):
+    """BlockingConnectionPool that counts its connections itself, through the public pool methods."""
+
+    def __init__(self, **kwargs) -> None:
+        self.created_connections = 0
+        self.checked_out: set = set()
+        super().__init__(**kwargs)
+
+    def reset(self):
+        super().reset()
+        self.created_connections = 0
+        self.checked_out = set()
+
+    def make_connection(self):
+        self.created_connections += 1
+        return super().make_connection()
+
+    async def get_connection(self, *args, **kwargs):
+        connection = await super().get_connection(*args, **kwargs)
+        self.checked_out.add(connection)
+        return connection
+
+    async def release(self, connection):
+        # also called for connections that failed their check before being handed out
+        self.checked_out.discard(connection)
+        await super().release(connection)
+
+
 class RedisConnector:
-    def __init__(self, host: str, port: int, db: str = '', prefix: str = "cache") -> None:
-        self.client = Redis(host=host, port=port, db=db)
+    def __init__(self, host: str, port: int, db: int = 0, prefix: str = "cache") -> None:
+        # waits up to REDIS_POOL_TIMEOUT for a free connection
+        self.pool = InstrumentedConnectionPool(
+            host=host,
+            port=port,
+            db=db,
+            max_connections=config.REDIS_MAX_CONNECTIONS,
+            timeout=config.REDIS_POOL_TIMEOUT,
+            socket_timeout=config.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=config.REDIS_SOCKET_CONNECT_TIMEOUT,
+            socket_keepalive=config.REDIS_SOCKET_KEEPALIVE,
+            health_check_interval=config.REDIS_HEALTH_CHECK_INTERVAL,
+        )
+        self.client = Redis(connection_pool=self.pool)
         self.prefix = prefix
         # Ensure key is 32 bytes for AES-256
         self.key = self._prepare_key(config.REDIS_KEY)
 
+    async def connect(self):
+        """Open a connection up front, so the first request does not pay for it."""
+        if not HIREDIS_AVAILABLE:
+            logger.warning("hiredis is not installed, redis replies are parsed in python")
+        await self.client.ping()
+    
+    async def close(self):
+        await self.client.aclose()
+        await self.pool.disconnect()
+    
+    def get_pool_stats(self) -> dict:
+        in_use = len(self.pool.checked_out)
+        return {
+            "max_connections": self.pool.max_connections,
+            "in_use": in_use,
+            "idle": self.pool.created_connections - in_use,
+            "created": self.pool.created_connections,
+        }
+
     def _prepare_key(self, key: str) -> bytes:
         """Prepare the encryption key to be 32 bytes."""
         if isinstance(key, str):
@@ -66,15 +131,94 @@ class RedisConnector:
         # Convert back to Python object
         return json.loads(decrypted_data.decode('utf-8'))
     
-    async def read(self, key: str):
-        encrypted_value = await self.client.get(self.get_key(key))
-        if encrypted_value:
-            return self.decrypt_value(encrypted_value)
-        return None
+    def encrypt_values(self, values: list) -> list[str]:
+        return [self.encrypt_value(value) for value in values]
+    
+    def decrypt_values(self, encrypted_values: list) -> list:
+        """Decrypt a batch, missing values (None) stay None."""
+        return [self.decrypt_value(value) if value else None for value in encrypted_values]
+    
+    async def read(self, key: str, encrypted: bool = True):
+        value = await self.client.get(self.get_key(key))
+        if value and encrypted:
+            return self.decrypt_value(value)
+        return value
     
-    async def write(self, key: str, value: any, ttl: int = 60 * 60 * 24 * 14):
-        encrypted_value = self.encrypt_value(value)
-        return await self.client.set(self.get_key(key), encrypted_value, ex=ttl)
+    async def write(self, key: str, value: any, ttl: int = 60 * 60 * 24 * 14, encrypt: bool = True):
+        """Store value under key, encrypt=False stores value as is (str, bytes or number)."""
+        if encrypt:
+            value = self.encrypt_value(value)
+        return await self.client.set(self.get_key(key), value, ex=ttl)
     
     async def delete(self, key: str):
-        return await self.client.delete(self.get_key(key))
\ No newline at end of file
+        return await self.client.delete(self.get_key(key))
+    
+    async def publish(self, channel: str, message: any):
+        return await self.client.publish(self.get_key(channel), json.dumps(message))
+    
+    async def read_many(self, keys: list[str], encrypted: bool = True) -> dict:
+        """Read all keys with a single MGET, missing keys map to None."""
+        if not keys:
+            return {}
+        values = await self.client.mget([self.get_key(key) for key in keys])
+        if encrypted:
+            values = self.decrypt_values(values)
+        return dict(zip(keys, values))
+    
+    async def write_many(self, items: dict, ttl: int = 60 * 60 * 24 * 14, encrypt: bool = True):
+        """Write all items in one round trip, encrypt=False stores the values as is."""
+        if not items:
+            return []
+        values = self.encrypt_values(list(items.values())) if encrypt else list(items.values())
+        async with self.pipeline() as pipe:
+            for key, value in zip(items.keys(), values):
+                pipe.write(key, value, ttl=ttl, encrypt=False)
+        return pipe.results
+    
+    async def get_set_union(self, keys: list[str]) -> list[str]:
+        """Members of all the sets with a single SUNION."""
+        if not keys:
+            return []
+        return [member.decode("utf-8") for member in await self.client.sunion([self.get_key(key) for key in keys])]
+    
+    async def delete_many(self, keys: list[str]):
+        if not keys:
+            return 0
+        return await self.client.delete(*[self.get_key(key) for key in keys])
+    
+    @asynccontextmanager
+    async def pipeline(self, transaction: bool = False):
+        """Queue commands and send them in one round trip when the block exits, replies end up in pipe.results."""
+        async with self.client.pipeline(transaction=transaction) as client_pipeline:
+            pipe = RedisPipeline(self, client_pipeline)
+            yield pipe
+            pipe.results = await client_pipeline.execute()
+
+
+class RedisPipeline:
+    """Prefixing and encrypting counterpart of RedisConnector for queued commands."""
+
+    def __init__(self, redis_connector: RedisConnector, client_pipeline) -> None:
+        self.redis_connector = redis_connector
+        self.client_pipeline = client_pipeline
+        self.results = None
+
+    def write(self, key: str, value: any, ttl: int = 60 * 60 * 24 * 14, encrypt: bool = True):
+        if encrypt:
+            value = self.redis_connector.encrypt_value(value)
+        self.client_pipeline.set(self.redis_connector.get_key(key), value, ex=ttl)
+        return self
+
+    def delete(self, *keys: str):
+        self.client_pipeline.delete(*[self.redis_connector.get_key(key) for key in keys])
+        return self
+
+    def add_to_set(self, key: str, *members: str, ttl: int = None):
+        self.client_pipeline.sadd(self.redis_connector.get_key(key), *members)
+        if ttl is not None:
+            self.client_pipeline.expire(self.redis_connector.get_key(key), ttl)
+        return self
+
+    def publish(self, channel: str, message: any):
+        self.client_pipeline.publish(self.redis_connector.get_key(channel), json.dumps(message))
+        return self
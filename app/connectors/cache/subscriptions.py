@@ -0,0 +1,87 @@
+import asyncio
+import json
+from typing import Callable
+
+from app.common.logger import Logger
+from app.connectors.cache.redis import RedisConnector, get_redis_connector
+
+logger = Logger(__name__)
+
+redis_subscriber = None
+
+def get_redis_subscriber():
+    global redis_subscriber
+    if redis_subscriber is None:
+        redis_subscriber = RedisSubscriber(redis_connector=get_redis_connector())
+    return redis_subscriber
+
+
+class RedisSubscriber:
+    """
+    One pub/sub connection per worker. Messages published while it is down are lost, so the
+    reconnect handlers run whenever it is (re)established.
+    """
+
+    RECONNECT_DELAY = 1
+    POLL_TIMEOUT = 1
+
+    def __init__(self, redis_connector: RedisConnector) -> None:
+        self.redis_connector = redis_connector
+        self.handlers: dict[str, list[Callable[[any], None]]] = {}
+        self.reconnect_handlers: list[Callable[[], None]] = []
+        self.task: asyncio.Task | None = None
+
+    def subscribe(self, channel: str, handler: Callable[[any], None]):
+        self.handlers.setdefault(self.redis_connector.get_key(channel), []).append(handler)
+
+    def on_reconnect(self, handler: Callable[[], None]):
+        self.reconnect_handlers.append(handler)
+
+    async def start(self):
+        if self.task is None and self.handlers:
+            self.task = asyncio.create_task(self.listen())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def listen(self):
+        while True:
+            pubsub = self.redis_connector.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(*self.handlers.keys())
+                for handler in self.reconnect_handlers:
+                    handler()
+
+                while True:
+                    # an explicit timeout keeps an idle channel from tripping the socket timeout
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=self.POLL_TIMEOUT)
+                    if message is not None and message["type"] == "message":
+                        self.dispatch(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                logger.warning(f"redis subscription lost, reconnecting in {self.RECONNECT_DELAY}s : {str(ex)}")
+                await asyncio.sleep(self.RECONNECT_DELAY)
+            finally:
+                await pubsub.aclose()
+
+    def dispatch(self, channel: bytes | str, data: bytes | str):
+        if isinstance(channel, bytes):
+            channel = channel.decode("utf-8")
+        try:
+            message = json.loads(data)
+        except ValueError:
+            logger.warning(f"ignoring malformed message on {channel}")
+            return
+
+        for handler in self.handlers.get(channel, []):
+            try:
+                handler(message)
+            except Exception as ex:
+                logger.error(f"error occurred while handling message on {channel} : {str(ex)}")
@@ -0,0 +1,61 @@
+import json
+from typing import NamedTuple
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) of a statement, its values are sent as bound parameters."""
+
+    inherit_cache = False
+
+    def __init__(self, statement) -> None:
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def compile_explain(element: Explain, compiler, **kwargs) -> str:
+    return f"EXPLAIN (FORMAT JSON) {compiler.process(element.statement, **kwargs)}"
+
+
+async def get_plan(connection: AsyncConnection, statement) -> dict:
+    """The root node of EXPLAIN (FORMAT JSON), the statement is planned without running it."""
+    plan = (await connection.execute(Explain(statement))).scalar_one()
+    if isinstance(plan, (str, bytes)):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def find_seq_scans(plan: dict) -> list[str]:
+    """Relations scanned sequentially anywhere in the plan tree."""
+    relations = []
+    if plan.get("Node Type") == "Seq Scan":
+        relations.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        relations.extend(find_seq_scans(child))
+    return relations
+
+
+class QueryPlan(NamedTuple):
+    call: str
+    query: str
+    plan: dict
+
+
+class ExplainingSession(AsyncSession):
+    """Session that records the plan of every select it executes, under the name of the current call."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.current_call: str | None = None
+        self.plans: list[QueryPlan] = []
+
+    async def exec(self, statement, **kwargs):
+        if self.current_call is not None and isinstance(statement, Select):
+            connection = await self.connection()
+            plan = await get_plan(connection, statement)
+            self.plans.append(QueryPlan(call=self.current_call, query=str(statement), plan=plan))
+        return await super().exec(statement, **kwargs)
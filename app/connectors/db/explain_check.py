@@ -0,0 +1,101 @@
+"""
+Reports the service queries whose plan scans a large table sequentially, run it against a
+production sized dataset.
+
+    python manage.py explain-check --min-rows 10000
+"""
+from typing import Awaitable, Callable, NamedTuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.common.logger import Logger
+from app.connectors.db.explain import ExplainingSession, QueryPlan, find_seq_scans
+from app.connectors.db.postgres import engine
+from app.models.db.schema import User, UserSignUpVerification
+from app.models.requests.schema import LoginRequest
+from app.services import user_permission_service, user_profile_service, user_role_service, user_service
+
+logger = Logger(__name__)
+
+
+class Samples(NamedTuple):
+    user_id: int
+    email: str
+    password: str
+    role_id: int
+    verification_code: str
+
+
+async def get_samples(session: AsyncSession) -> Samples:
+    """Real values to call the services with, placeholders on an empty database."""
+    user = (await session.exec(select(User).order_by(User.id.desc()).limit(1))).first()
+    verification = (await session.exec(select(UserSignUpVerification).order_by(UserSignUpVerification.id.desc()).limit(1))).first()
+    return Samples(
+        user_id=verification.user_id if verification else (user.id if user else 0),
+        email=user.email if user else "nobody@example.com",
+        password=user.password if user else "",
+        role_id=user.role_id if user else 0,
+        verification_code=verification.verification_code if verification else "",
+    )
+
+
+def get_service_calls(samples: Samples) -> list[tuple[str, Callable[[AsyncSession], Awaitable]]]:
+    email_prefix = samples.email[:4]
+    return [
+        ("user_service.get_user", lambda db: user_service.get_user(db=db, user_id=samples.user_id)),
+        ("user_service.get_user_by_email", lambda db: user_service.get_user_by_email(db, samples.email)),
+        ("user_service.login_user", lambda db: user_service.login_user(db=db, login_request=LoginRequest(email=samples.email, password=samples.password))),
+        ("user_service.list_users(search)", lambda db: user_service.list_users(db=db, q=email_prefix, sort_dir="asc", sort_column=None, count_strategy="none")),
+        ("user_service.list_users(created_at)", lambda db: user_service.list_users(db=db, q="", sort_dir="desc", sort_column="created_at", count_strategy="none")),
+        ("user_service.verify_user_sign_up", lambda db: user_service.verify_user_sign_up(db=db, user_id=samples.user_id, verification_code=samples.verification_code)),
+        ("user_profile_service.get_user_profile", lambda db: user_profile_service.get_user_profile(db=db, user_id=samples.user_id)),
+        ("user_role_service.get_user_role", lambda db: user_role_service.get_user_role(db=db, user_role_id=samples.role_id)),
+        ("user_role_service.get_user_role_permissions", lambda db: user_role_service.get_user_role_permissions(db=db, user_role_id=samples.role_id)),
+        ("user_role_service.get_user_role_permission_ids", lambda db: user_role_service.get_user_role_permission_ids(db=db, user_role_id=samples.role_id)),
+        ("user_permission_service.get_permission_by_user_role", lambda db: user_permission_service.get_permission_by_user_role(db=db, user_role_id=samples.role_id)),
+    ]
+
+
+async def get_table_sizes(connection: AsyncConnection, table_names: set[str]) -> dict[str, int]:
+    rows = (await connection.execute(
+        text("SELECT relname, reltuples::bigint FROM pg_class WHERE relkind = 'r' AND relname = ANY(:table_names)"),
+        {"table_names": list(table_names)},
+    )).all()
+    return {relname: reltuples for relname, reltuples in rows}
+
+
+async def explain_check(min_rows: int = 10000, analyze: bool = False) -> tuple[list[QueryPlan], list[str]]:
+    """The recorded plans and a failure for every sequential scan on a table of at least min_rows rows."""
+    async with engine.connect() as connection:
+        if analyze:
+            await connection.exec_driver_sql("ANALYZE")
+
+        transaction = await connection.begin()
+        try:
+            # commits inside the services only release a savepoint of the outer transaction
+            session = ExplainingSession(bind=connection, join_transaction_mode="create_savepoint", expire_on_commit=False)
+            samples = await get_samples(session)
+
+            for name, call in get_service_calls(samples):
+                session.current_call = name
+                try:
+                    await call(session)
+                except Exception as ex:
+                    # e.g. nothing found for the sample values, the plan is recorded before
+                    logger.info(f"{name} raised {type(ex).__name__} : {str(ex)}")
+            session.current_call = None
+
+            plans = session.plans
+            table_sizes = await get_table_sizes(connection, {relation for plan in plans for relation in find_seq_scans(plan.plan)})
+        finally:
+            await transaction.rollback()
+
+    failures = []
+    for plan in plans:
+        for relation in find_seq_scans(plan.plan):
+            rows = table_sizes.get(relation, 0)
+            if rows >= min_rows:
+                failures.append(f"{plan.call} scans {relation} ({rows} rows) sequentially : {plan.query}")
+    return plans, failures
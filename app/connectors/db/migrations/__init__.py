@@ -0,0 +1,163 @@
+"""
+Versioned schema migrations, one module v<number>_<name>.py in the versions package per migration,
+each defining description, transactional (default True) and async upgrade(connection).
+"""
+import importlib
+import pkgutil
+from types import ModuleType
+from typing import NamedTuple
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.common.logger import Logger
+from app.connectors.db.migrations import versions
+from app.connectors.db.postgres import engine, seed_database
+from app.connectors.db.seeders import SEED_VERSION
+
+logger = Logger(__name__)
+
+# any constant works, it only has to be the same for every process running migrations
+MIGRATION_LOCK_ID = 7283641001
+
+CREATE_SCHEMA_MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+)
+"""
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    module: ModuleType
+
+    @property
+    def description(self) -> str:
+        return getattr(self.module, "description", self.name)
+
+    @property
+    def transactional(self) -> bool:
+        return getattr(self.module, "transactional", True)
+
+
+def load_migrations() -> list[Migration]:
+    migrations = []
+    for module_info in pkgutil.iter_modules(versions.__path__):
+        number, _, name = module_info.name.partition("_")
+        if not number.startswith("v") or not number[1:].isdigit():
+            continue
+        module = importlib.import_module(f"{versions.__name__}.{module_info.name}")
+        migrations.append(Migration(version=int(number[1:]), name=name, module=module))
+
+    migrations.sort(key=lambda migration: migration.version)
+    for previous, current in zip(migrations, migrations[1:]):
+        if previous.version == current.version:
+            raise RuntimeError(f"migrations {previous.name} and {current.name} share the version {current.version}")
+    return migrations
+
+
+def get_latest_version() -> int:
+    migrations = load_migrations()
+    return migrations[-1].version if migrations else 0
+
+
+async def get_applied_versions(connection: AsyncConnection) -> set[int]:
+    return set((await connection.execute(text("SELECT version FROM schema_migrations"))).scalars().all())
+
+
+async def get_current_version() -> int:
+    """The highest applied version in a single query, 0 when nothing was ever migrated."""
+    async with engine.connect() as connection:
+        try:
+            return (await connection.execute(text("SELECT coalesce(max(version), 0) FROM schema_migrations"))).scalar_one()
+        except ProgrammingError:
+            # schema_migrations does not exist yet
+            return 0
+
+
+async def get_database_versions() -> tuple[int, int]:
+    """The schema version and the seed version in a single query, 0 for what was never applied."""
+    async with engine.connect() as connection:
+        try:
+            return tuple((await connection.execute(text(
+                "SELECT (SELECT coalesce(max(version), 0) FROM schema_migrations), "
+                "(SELECT coalesce(max(version), 0) FROM seed_versions)"
+            ))).one())
+        except ProgrammingError:
+            # schema_migrations or seed_versions does not exist yet
+            pass
+    return await get_current_version(), 0
+
+
+async def check_database():
+    """Refuses a schema behind the code and seeds the default data when it is outdated."""
+    current_version, seed_version = await get_database_versions()
+    latest_version = get_latest_version()
+    if current_version < latest_version:
+        raise RuntimeError(
+            f"database schema is at version {current_version} but the app needs {latest_version}, "
+            f"run `python manage.py migrate` first"
+        )
+    if current_version > latest_version:
+        logger.warning(f"database schema is at version {current_version}, newer than this app ({latest_version})")
+    if seed_version < SEED_VERSION:
+        await seed_database()
+
+
+async def apply_migration(migration: Migration):
+    logger.info(f"applying migration {migration.version} {migration.name} : {migration.description}")
+    record = text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description)")
+    parameters = {"version": migration.version, "description": migration.description}
+
+    if migration.transactional:
+        async with engine.begin() as connection:
+            await migration.module.upgrade(connection)
+            await connection.execute(record, parameters)
+        return
+
+    async with engine.connect() as connection:
+        connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        await migration.module.upgrade(connection)
+        await connection.execute(record, parameters)
+
+
+async def migrate(target_version: int = None) -> list[Migration]:
+    """Applies every pending migration up to target_version (default all), returns the applied ones."""
+    migrations = load_migrations()
+    applied = []
+
+    # autocommit, an open transaction on this connection would block CREATE INDEX CONCURRENTLY
+    async with engine.connect() as lock_connection:
+        lock_connection = await lock_connection.execution_options(isolation_level="AUTOCOMMIT")
+        await lock_connection.execute(text("SELECT pg_advisory_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+        try:
+            await lock_connection.execute(text(CREATE_SCHEMA_MIGRATIONS_TABLE))
+            applied_versions = await get_applied_versions(lock_connection)
+
+            for migration in migrations:
+                if migration.version in applied_versions:
+                    continue
+                if target_version is not None and migration.version > target_version:
+                    break
+                await apply_migration(migration)
+                applied.append(migration)
+        finally:
+            await lock_connection.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+
+    logger.info(f"applied {len(applied)} migrations, schema is at version {await get_current_version()}")
+    return applied
+
+
+async def create_index_concurrently(connection: AsyncConnection, index_name: str, definition: str):
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS, dropping an invalid index left by a failed build first."""
+    is_valid = (await connection.execute(
+        text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:index_name)"),
+        {"index_name": index_name},
+    )).scalar_one_or_none()
+    if is_valid is False:
+        logger.warning(f"dropping invalid index {index_name} left by an earlier build")
+        await connection.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+    await connection.exec_driver_sql(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} {definition}")
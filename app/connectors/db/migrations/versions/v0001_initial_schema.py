@@ -0,0 +1,111 @@
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+description = "create the baseline tables"
+
+# the schema as it was before migrations existed, later changes belong to later migrations.
+# IF NOT EXISTS, so databases created by create_all back then are adopted as is
+BASELINE_SCHEMA = [
+    """
+    DO $$ BEGIN
+        CREATE TYPE userstatus AS ENUM ('INACTIVE', 'CREATED', 'VERIFIED');
+    EXCEPTION WHEN duplicate_object THEN NULL;
+    END $$
+    """,
+    """
+    DO $$ BEGIN
+        CREATE TYPE usersignupverificationstatus AS ENUM ('PENDING', 'VERIFIED', 'EXPIRED');
+    EXCEPTION WHEN duplicate_object THEN NULL;
+    END $$
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS permissions (
+        id SERIAL NOT NULL,
+        created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        permission_name VARCHAR NOT NULL,
+        PRIMARY KEY (id),
+        UNIQUE (permission_name)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_roles (
+        created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        id SERIAL NOT NULL,
+        role_name VARCHAR NOT NULL,
+        PRIMARY KEY (id),
+        UNIQUE (role_name)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_role_permissions (
+        role_id INTEGER NOT NULL,
+        permission_id INTEGER NOT NULL,
+        PRIMARY KEY (role_id, permission_id),
+        FOREIGN KEY (role_id) REFERENCES user_roles (id),
+        FOREIGN KEY (permission_id) REFERENCES permissions (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        id SERIAL NOT NULL,
+        first_name VARCHAR,
+        last_name VARCHAR,
+        email VARCHAR NOT NULL,
+        password VARCHAR NOT NULL,
+        status userstatus NOT NULL,
+        role_id INTEGER NOT NULL,
+        PRIMARY KEY (id),
+        UNIQUE (email),
+        FOREIGN KEY (role_id) REFERENCES user_roles (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_profiles (
+        id SERIAL NOT NULL,
+        created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        user_id INTEGER NOT NULL,
+        profile_picture VARCHAR,
+        bio VARCHAR,
+        location VARCHAR,
+        website VARCHAR,
+        contact_number VARCHAR,
+        address VARCHAR,
+        city VARCHAR,
+        state VARCHAR,
+        country VARCHAR,
+        zip_code VARCHAR,
+        date_of_birth TIMESTAMP WITHOUT TIME ZONE,
+        gender VARCHAR,
+        marital_status VARCHAR,
+        occupation VARCHAR,
+        education VARCHAR,
+        religion VARCHAR,
+        caste VARCHAR,
+        nationality VARCHAR,
+        PRIMARY KEY (id),
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_sign_up_verifications (
+        id SERIAL NOT NULL,
+        created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        user_id INTEGER NOT NULL,
+        verification_code VARCHAR NOT NULL,
+        status usersignupverificationstatus NOT NULL,
+        expires_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+    """,
+]
+
+
+async def upgrade(connection: AsyncConnection):
+    for statement in BASELINE_SCHEMA:
+        await connection.exec_driver_sql(statement)
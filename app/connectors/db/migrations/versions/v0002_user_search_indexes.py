@@ -0,0 +1,18 @@
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.connectors.db.migrations import create_index_concurrently
+
+description = "pagination and search indexes on users, built without locking the table"
+transactional = False
+
+
+async def upgrade(connection: AsyncConnection):
+    await connection.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    await create_index_concurrently(connection, "ix_users_created_at_id", "ON users (created_at, id)")
+    await create_index_concurrently(connection, "ix_users_email_trgm", "ON users USING gin (email gin_trgm_ops)")
+    await create_index_concurrently(
+        connection,
+        "ix_users_full_name_trgm",
+        "ON users USING gin (((coalesce(first_name, '') || ' ') || coalesce(last_name, '')) gin_trgm_ops)",
+    )
+    await create_index_concurrently(connection, "ix_users_email_prefix", "ON users (lower(email) text_pattern_ops)")
@@ -0,0 +1,17 @@
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.connectors.db.migrations import create_index_concurrently
+
+description = "indexes on the columns the services look rows up by"
+transactional = False
+
+
+async def upgrade(connection: AsyncConnection):
+    await create_index_concurrently(connection, "ix_users_role_id", "ON users (role_id)")
+    await create_index_concurrently(connection, "ix_user_profiles_user_id", "ON user_profiles (user_id)")
+    await create_index_concurrently(
+        connection,
+        "ix_user_sign_up_verifications_user_id_verification_code",
+        "ON user_sign_up_verifications (user_id, verification_code)",
+    )
+    await create_index_concurrently(connection, "ix_user_role_permissions_permission_id", "ON user_role_permissions (permission_id)")
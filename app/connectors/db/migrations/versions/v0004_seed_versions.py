@@ -0,0 +1,13 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+description = "table recording the version of the seeded default data"
+
+
+async def upgrade(connection: AsyncConnection):
+    await connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS seed_versions (
+            version INTEGER PRIMARY KEY,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """))
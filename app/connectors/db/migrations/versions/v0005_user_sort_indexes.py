@@ -0,0 +1,13 @@
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.connectors.db.migrations import create_index_concurrently
+
+description = "(column, id) indexes on users for every sort column of the user listing"
+transactional = False
+
+
+async def upgrade(connection: AsyncConnection):
+    await create_index_concurrently(connection, "ix_users_updated_at_id", "ON users (updated_at, id)")
+    await create_index_concurrently(connection, "ix_users_email_id", "ON users (email, id)")
+    await create_index_concurrently(connection, "ix_users_first_name_id", "ON users (first_name, id)")
+    await create_index_concurrently(connection, "ix_users_last_name_id", "ON users (last_name, id)")
@@ -0,0 +1,15 @@
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.connectors.db.migrations import create_index_concurrently
+
+description = "trigram GiST indexes on users for the nearest relevance candidates"
+transactional = False
+
+
+async def upgrade(connection: AsyncConnection):
+    await create_index_concurrently(connection, "ix_users_email_trgm_gist", "ON users USING gist (email gist_trgm_ops)")
+    await create_index_concurrently(
+        connection,
+        "ix_users_full_name_trgm_gist",
+        "ON users USING gist (((coalesce(first_name, '') || ' ') || coalesce(last_name, '')) gist_trgm_ops)",
+    )
@@ -0,0 +1,62 @@
+import threading
+import time
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# upper bounds (in milliseconds) of the checkout wait time histogram buckets
+WAIT_TIME_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf")]
+
+
+class PoolMetrics:
+    def __init__(self, buckets: list[float] = WAIT_TIME_BUCKETS_MS) -> None:
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record_checkout(self, wait_ms: float):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            for index, upper_bound in enumerate(self.buckets):
+                if wait_ms <= upper_bound:
+                    self.bucket_counts[index] += 1
+                    break
+
+    def record_failure(self):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "avg_wait_ms": self.total_wait_ms / self.checkouts if self.checkouts else 0.0,
+                "max_wait_ms": self.max_wait_ms,
+                "wait_time_histogram_ms": {
+                    ("+Inf" if upper_bound == float("inf") else str(upper_bound)): count
+                    for upper_bound, count in zip(self.buckets, self.bucket_counts)
+                },
+            }
+
+
+# kept at module level so the numbers survive pool.recreate() on engine.dispose()
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long each checkout waited and how many failed."""
+
+    def connect(self):
+        started_at = time.perf_counter()
+        try:
+            connection = super().connect()
+        except Exception:
+            pool_metrics.record_failure()
+            raise
+        pool_metrics.record_checkout((time.perf_counter() - started_at) * 1000)
+        return connection
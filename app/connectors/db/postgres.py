@@ -1,32 +1,57 @@
-from typing import Annotated
+from typing import Annotated, AsyncGenerator
 from fastapi import Depends
-from sqlmodel import SQLModel, Session,create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.common.configuration import config
 
 
 from app.common.logger import Logger
-from app.connectors.db.seeders import seed_permissions, seed_user_role_permissions, seed_user_roles, seed_users
+from app.connectors.db.pool_metrics import InstrumentedQueuePool, pool_metrics
+from app.connectors.db.seeders import SEED_VERSION, record_seed_version, seed_permissions, seed_user_role_permissions, seed_user_roles, seed_users
 
 
 logger = Logger(__name__)
-pg_url = f"postgresql+psycopg2://{config.DB_USER}:{config.DB_PASSWORD}@{config.DB_HOST}:{config.DB_POST}/{config.DB_NAME}"
-
-engine = create_engine(pg_url)
-
-def get_session():
-    with Session(engine) as session:
+pg_url = f"postgresql+asyncpg://{config.DB_USER}:{config.DB_PASSWORD}@{config.DB_HOST}:{config.DB_POST}/{config.DB_NAME}"
+
+engine = create_async_engine(
+    pg_url,
+    poolclass=InstrumentedQueuePool,
+    pool_size=config.DB_POOL_SIZE,
+    max_overflow=config.DB_MAX_OVERFLOW,
+    pool_timeout=config.DB_POOL_TIMEOUT,
+    pool_recycle=config.DB_POOL_RECYCLE,
+    pool_pre_ping=config.DB_POOL_PRE_PING,
+)
+
+# routes read objects after commit, an expired attribute would load lazily outside of an await
+async_session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+async def get_session() -> AsyncGenerator[AsyncSession, None]:
+    async with async_session_maker() as session:
         yield session
 
-SessionDep = Annotated[Session, Depends(get_session)]
-
-
-def create_db_and_tables():
-    logger.info("creating database")
-    SQLModel.metadata.create_all(engine)
-    
-    # Seed initial data
-    with Session(engine) as session:
-        seed_permissions(session)
-        seed_user_roles(session)
-        seed_user_role_permissions(session)
-        seed_users(session)
+SessionDep = Annotated[AsyncSession, Depends(get_session)]
+
+
+def get_pool_stats() -> dict:
+    pool = engine.pool
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        # QueuePool counts overflow from -pool_size until the pool is full
+        "overflow": max(pool.overflow(), 0),
+        **pool_metrics.snapshot(),
+    }
+
+
+async def seed_database():
+    """Creates the default data and records the seed version in one transaction."""
+    async with engine.begin() as connection:
+        await seed_permissions(connection)
+        await seed_user_roles(connection)
+        await seed_user_role_permissions(connection)
+        await seed_users(connection)
+        await record_seed_version(connection)
+    logger.info(f"seeded the default data, seed version {SEED_VERSION}")
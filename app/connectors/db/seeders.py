@@ -1,246 +1,95 @@
+"""
+Default permissions, roles and users, each seeded with a single INSERT ... ON CONFLICT DO NOTHING.
+Bump SEED_VERSION when the data below changes.
+"""
 from datetime import datetime
-from sqlmodel import Session
-from app.models.db.schema import Permission, User, UserRole, UserRolePermissionLink
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.common.constants import Permissions
 from app.common.logger import Logger
+from app.models.db.schema import Permission, User, UserRole, UserRolePermissionLink
 
 logger = Logger(__name__)
 
-def seed_permissions(session: Session):
+SEED_VERSION = 2
+
+USER_ROLES = ["admin", "user", "guest"]
+
+USER_ROLE_PERMISSIONS = {
+    "admin": [permission.value for permission in Permissions],
+}
+
+USERS = [
+    {"email": "admin@example.com", "password": "5f4dcc3b5aa765d61d8327deb882cf99", "role_name": "admin"},
+    {"email": "user@example.com", "password": "5f4dcc3b5aa765d61d8327deb882cf99", "role_name": "user"},
+]
+
+
+async def seed_permissions(connection: AsyncConnection):
     """Seed initial permissions into the database"""
-    try:
-        # Check if permissions already exist
-        existing_permissions = session.query(Permission).all()
-        if existing_permissions:
-            logger.info("Permissions already exist, skipping seeding")
-            return
-        
-        # Define initial permissions
-        permissions = [
-            Permission(
-                permission_name="create_user",
-                created_at=datetime.now(),
-                updated_at=datetime.now()
-            ),
-            Permission(
-                permission_name="read_user",
-                created_at=datetime.now(),
-                updated_at=datetime.now()
-            ),
-            Permission(
-                permission_name="update_user",
-                created_at=datetime.now(),
-                updated_at=datetime.now()
-            ),
-            Permission(
-                permission_name="delete_user",
-                created_at=datetime.now(),
-                updated_at=datetime.now()
-            ),
-            Permission(
-                permission_name="create_user_role",
-                created_at=datetime.now(),
-                updated_at=datetime.now()
-            ),
-            Permission(
-                permission_name="read_user_role",
-                created_at=datetime.now(),
-                updated_at=datetime.now()
-            ),
-            Permission(
-                permission_name="update_user_role",
-                created_at=datetime.now(),
-                updated_at=datetime.now()
-            ),
-            Permission(
-                permission_name="delete_user_role",
-                created_at=datetime.now(),
-                updated_at=datetime.now()
-            ),
-            Permission(
-                permission_name="create_permission",
-                created_at=datetime.now(),
-                updated_at=datetime.now(),
-            ),
-            Permission(
-                permission_name="read_permission",
-                created_at=datetime.now(),
-                updated_at=datetime.now()
-            ),
-            Permission(
-                permission_name="update_permission",
-                created_at=datetime.now(),
-                updated_at=datetime.now()
-            ),
-            Permission(
-                permission_name="delete_permission",
-                created_at=datetime.now(),
-                updated_at=datetime.now()
-            )
-        ]
-        
-        # Add permissions to session
-        for permission in permissions:
-            session.add(permission)
-        
-        # Commit the changes
-        session.commit()
-        logger.info("Successfully seeded permissions")
-    except Exception as e:
-        logger.error(f"Error seeding permissions: {e}")
-        session.rollback()
-        raise e 
-    
-def seed_user_roles(session: Session):
+    now = datetime.now()
+    statement = insert(Permission).values([
+        {"permission_name": permission.value, "created_at": now, "updated_at": now}
+        for permission in Permissions
+    ]).on_conflict_do_nothing(index_elements=["permission_name"])
+    result = await connection.execute(statement)
+    logger.info(f"seeded {result.rowcount} permissions")
+
+
+async def seed_user_roles(connection: AsyncConnection):
     """Seed initial user roles into the database"""
-    try:
-        # Check if roles already exist
-        existing_roles = session.query(UserRole).all()
-        if existing_roles:
-            logger.info("User roles already exist, skipping seeding")
-            return
-
-        # Define initial roles
-        roles = [
-            UserRole(
-                role_name="admin",
-                created_at=datetime.now(),
-                updated_at=datetime.now()
-            ),
-            UserRole(
-                role_name="user",
-                created_at=datetime.now(),
-                updated_at=datetime.now()
-            ),
-            UserRole(
-                role_name="guest",
-                created_at=datetime.now(),
-                updated_at=datetime.now()
-            )
-        ]
-
-        # Add roles to session
-        for role in roles:
-            session.add(role)
-        
-        # Commit the changes
-        session.commit()
-        logger.info("Successfully seeded user roles")
-    except Exception as e:
-        logger.error(f"Error seeding user roles: {e}")
-        session.rollback()
-        raise e 
-    
-
-def seed_user_role_permissions(session: Session):
+    now = datetime.now()
+    statement = insert(UserRole).values([
+        {"role_name": role_name, "created_at": now, "updated_at": now}
+        for role_name in USER_ROLES
+    ]).on_conflict_do_nothing(index_elements=["role_name"])
+    result = await connection.execute(statement)
+    logger.info(f"seeded {result.rowcount} user roles")
+
+
+async def seed_user_role_permissions(connection: AsyncConnection):
     """Seed initial user role permissions into the database"""
-    try:
-        # Check if user role permissions already exist
-        existing_user_role_permissions = session.query(UserRolePermissionLink).all()
-        if existing_user_role_permissions:
-            logger.info("User role permissions already exist, skipping seeding")
-            return
-
-        # Define initial user role permissions
-        user_role_permissions = [
-            UserRolePermissionLink(
-                role_id=1,
-                permission_id=1
-            ),
-            UserRolePermissionLink(
-                role_id=1,
-                permission_id=2
-            ),
-            UserRolePermissionLink(
-                role_id=1,
-                permission_id=3
-            ),
-            UserRolePermissionLink(
-                role_id=1,
-                permission_id=4
-            ),
-            UserRolePermissionLink(
-                role_id=1,
-                permission_id=5
-            ),
-            UserRolePermissionLink(
-                role_id=1,
-                permission_id=6
-            ),
-            UserRolePermissionLink(
-                role_id=1,
-                permission_id=7
-            ),
-            UserRolePermissionLink(
-                role_id=1,
-                permission_id=8
-            ),
-            UserRolePermissionLink(
-                role_id=1,
-                permission_id=9
-            ),
-            UserRolePermissionLink(
-                role_id=1,
-                permission_id=10
-            ),
-            UserRolePermissionLink(
-                role_id=1,
-                permission_id=11
-            ),
-            UserRolePermissionLink(
-                role_id=1,
-                permission_id=12
-            ),
-        ]
-        
-        # Add user role permissions to session
-        for user_role_permission in user_role_permissions:
-            session.add(user_role_permission)
-        
-        # Commit the changes
-        session.commit()
-        logger.info("Successfully seeded user role permissions")
-    except Exception as e:
-        logger.error(f"Error seeding user role permissions: {e}")
-        session.rollback()
-        raise e 
-            
-def seed_users(session: Session):
+    seeded = 0
+    for role_name, permission_names in USER_ROLE_PERMISSIONS.items():
+        # INSERT ... SELECT, the ids are looked up by name in the same statement
+        role_permissions = (
+            select(UserRole.id, Permission.id)
+            .join(Permission, Permission.permission_name.in_(permission_names))
+            .where(UserRole.role_name == role_name)
+        )
+        statement = (
+            insert(UserRolePermissionLink)
+            .from_select(["role_id", "permission_id"], role_permissions)
+            .on_conflict_do_nothing(index_elements=["role_id", "permission_id"])
+        )
+        seeded += (await connection.execute(statement)).rowcount
+    logger.info(f"seeded {seeded} user role permissions")
+
+
+async def seed_users(connection: AsyncConnection):
     """Seed initial users into the database"""
-    try:
-        # Check if users already exist
-        existing_users = session.query(User).all()
-        if existing_users:
-            logger.info("Users already exist, skipping seeding")
-            return
-        
-        # Define initial users
-        users = [
-            User(
-                username="admin",
-                email="admin@example.com",
-                password="5f4dcc3b5aa765d61d8327deb882cf99",
-                role_id=1,
-                created_at=datetime.now(),
-                updated_at=datetime.now()
-            ),
-            User(
-                username="user",
-                email="user@example.com",
-                password="5f4dcc3b5aa765d61d8327deb882cf99",
-                role_id=2,
-                created_at=datetime.now(),
-                updated_at=datetime.now()
-            )
-        ]
-        
-        # Add users to session
-        for user in users:
-            session.add(user)
-            
-        # Commit the changes
-        session.commit()
-        logger.info("Successfully seeded users")
-    except Exception as e:
-        logger.error(f"Error seeding users: {e}")
-        session.rollback()
-        raise e 
\ No newline at end of file
+    now = datetime.now()
+    role_ids = dict((await connection.execute(
+        select(UserRole.role_name, UserRole.id).where(UserRole.role_name.in_({user["role_name"] for user in USERS}))
+    )).all())
+    statement = insert(User).values([
+        {
+            "email": user["email"],
+            "password": user["password"],
+            "role_id": role_ids[user["role_name"]],
+            "created_at": now,
+            "updated_at": now,
+        }
+        for user in USERS
+    ]).on_conflict_do_nothing(index_elements=["email"])
+    result = await connection.execute(statement)
+    logger.info(f"seeded {result.rowcount} users")
+
+
+async def record_seed_version(connection: AsyncConnection):
+    await connection.execute(
+        text("INSERT INTO seed_versions (version) VALUES (:version) ON CONFLICT DO NOTHING"),
+        {"version": SEED_VERSION},
+    )
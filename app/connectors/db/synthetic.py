@@ -0,0 +1,222 @@
+"""
+Synthetic data at production scale, the same seed generates the same rows.
+
+    python manage.py generate-data --users 1000000 --seed 42
+"""
+import random
+import string
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, List, NamedTuple
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.common.configuration import config
+from app.common.constants import UserSignUpVerificationStatus, UserStatus
+from app.common.logger import Logger
+from app.connectors.db.postgres import engine
+from app.connectors.db.seeders import USERS
+from app.models.db.schema import Permission, UserRole, UserRolePermissionLink
+
+logger = Logger(__name__)
+
+PRODUCTION_ENVIRONMENTS = ("prod", "production")
+
+# fixed, so that the timestamps do not depend on when the generator runs
+SYNTHETIC_EPOCH = datetime(2022, 1, 1)
+SYNTHETIC_PERIOD = timedelta(days=3 * 365)
+
+SYNTHETIC_PASSWORD = USERS[0]["password"]
+
+FIRST_NAMES = [
+    "James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+    "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Aarav", "Priya",
+    "Wei", "Mei", "Hiroshi", "Yuki", "Mohammed", "Fatima", "Carlos", "Sofia", "Olga", "Ivan",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Sharma", "Patel",
+    "Wang", "Li", "Tanaka", "Sato", "Khan", "Ali", "Silva", "Rossi", "Ivanov", "Novak",
+]
+EMAIL_DOMAINS = ["example.com", "example.org", "example.net", "mail.example.com", "corp.example.com"]
+LOCATIONS = [
+    ("Austin", "TX", "USA"), ("Seattle", "WA", "USA"), ("New York", "NY", "USA"), ("London", "England", "UK"),
+    ("Berlin", "Berlin", "Germany"), ("Bengaluru", "Karnataka", "India"), ("Mumbai", "Maharashtra", "India"),
+    ("Tokyo", "Tokyo", "Japan"), ("Sao Paulo", "SP", "Brazil"), ("Toronto", "ON", "Canada"),
+]
+OCCUPATIONS = ["Engineer", "Designer", "Teacher", "Nurse", "Accountant", "Student", "Manager", "Analyst", None]
+GENDERS = ["female", "male", "other", None]
+
+USER_STATUS_WEIGHTS = {UserStatus.VERIFIED: 70, UserStatus.CREATED: 25, UserStatus.INACTIVE: 5}
+
+USER_COLUMNS = ["id", "first_name", "last_name", "email", "password", "status", "role_id", "created_at", "updated_at"]
+PROFILE_COLUMNS = [
+    "user_id", "bio", "location", "city", "state", "country", "zip_code", "contact_number",
+    "date_of_birth", "gender", "occupation", "created_at", "updated_at",
+]
+VERIFICATION_COLUMNS = ["user_id", "verification_code", "status", "expires_at", "created_at", "updated_at"]
+
+VERIFICATION_CODE_CHARACTERS = string.ascii_letters + string.digits
+
+
+class LoadStats(NamedTuple):
+    table: str
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+class UserBatch(NamedTuple):
+    users: List[tuple]
+    profiles: List[tuple]
+    verifications: List[tuple]
+
+
+def get_role_weights(role_ids: dict[str, int], synthetic_role_ids: List[int]) -> tuple[List[int], List[float]]:
+    """Most users get the plain user role, a few are admins and the rest spread over the synthetic roles."""
+    weights = {role_ids[role_name]: weight for role_name, weight in (("user", 85.0), ("admin", 1.0), ("guest", 4.0)) if role_name in role_ids}
+    for role_id in synthetic_role_ids:
+        weights[role_id] = weights.get(role_id, 0.0) + 10.0 / len(synthetic_role_ids)
+    if not weights:
+        raise RuntimeError("there are no roles to assign, run `python manage.py migrate` first")
+    return list(weights), list(weights.values())
+
+
+def generate_user_batches(
+    rng: random.Random,
+    first_id: int,
+    count: int,
+    batch_size: int,
+    role_ids: List[int],
+    role_weights: List[float],
+    profile_ratio: float,
+    verification_ratio: float,
+) -> Iterator[UserBatch]:
+    statuses, status_weights = list(USER_STATUS_WEIGHTS), list(USER_STATUS_WEIGHTS.values())
+    period_seconds = int(SYNTHETIC_PERIOD.total_seconds())
+
+    for batch_start in range(first_id, first_id + count, batch_size):
+        batch = UserBatch(users=[], profiles=[], verifications=[])
+        for user_id in range(batch_start, min(batch_start + batch_size, first_id + count)):
+            # a few users without a name, the search has to cope with NULLs
+            first_name = rng.choice(FIRST_NAMES) if rng.random() > 0.05 else None
+            last_name = rng.choice(LAST_NAMES) if rng.random() > 0.05 else None
+            email = f"{(first_name or 'user').lower()}.{(last_name or 'anonymous').lower()}.{user_id}@{rng.choice(EMAIL_DOMAINS)}"
+            status = rng.choices(statuses, status_weights)[0]
+            created_at = SYNTHETIC_EPOCH + timedelta(seconds=rng.randrange(period_seconds))
+            updated_at = created_at + timedelta(seconds=rng.randrange(30 * 24 * 3600))
+            batch.users.append((
+                user_id, first_name, last_name, email, SYNTHETIC_PASSWORD, status.name,
+                rng.choices(role_ids, role_weights)[0], created_at, updated_at,
+            ))
+
+            if rng.random() < profile_ratio:
+                city, state, country = rng.choice(LOCATIONS)
+                batch.profiles.append((
+                    user_id, f"Synthetic user {user_id}", f"{city}, {country}", city, state, country,
+                    f"{rng.randrange(100000):05d}", f"+1{rng.randrange(10 ** 9, 10 ** 10)}",
+                    datetime(1950, 1, 1) + timedelta(days=rng.randrange(50 * 365)),
+                    rng.choice(GENDERS), rng.choice(OCCUPATIONS), created_at, updated_at,
+                ))
+
+            if rng.random() < verification_ratio:
+                if status == UserStatus.VERIFIED:
+                    verification_status = UserSignUpVerificationStatus.VERIFIED
+                else:
+                    verification_status = rng.choice([UserSignUpVerificationStatus.PENDING, UserSignUpVerificationStatus.EXPIRED])
+                batch.verifications.append((
+                    user_id, "".join(rng.choices(VERIFICATION_CODE_CHARACTERS, k=32)), verification_status.name,
+                    created_at + timedelta(days=1), created_at, updated_at,
+                ))
+        yield batch
+
+
+async def reserve_user_ids(connection: AsyncConnection, count: int) -> int:
+    """Moves the users id sequence past count new ids and returns the first of them."""
+    last_id = (await connection.execute(text(
+        "SELECT setval(pg_get_serial_sequence('users', 'id'), "
+        "greatest((SELECT coalesce(max(id), 0) FROM users), nextval(pg_get_serial_sequence('users', 'id'))) + :count)"
+    ), {"count": count})).scalar_one()
+    return last_id - count + 1
+
+
+async def generate_roles_and_permissions(rng: random.Random, connection: AsyncConnection, roles: int, permissions: int) -> List[int]:
+    """Creates the synthetic roles and permissions and links every role to a random subset of all permissions."""
+    now = SYNTHETIC_EPOCH
+    if permissions:
+        await connection.execute(insert(Permission).values([
+            {"permission_name": f"synthetic_permission_{index}", "created_at": now, "updated_at": now}
+            for index in range(permissions)
+        ]).on_conflict_do_nothing(index_elements=["permission_name"]))
+    if not roles:
+        return []
+
+    role_names = [f"synthetic_role_{index}" for index in range(roles)]
+    await connection.execute(insert(UserRole).values([
+        {"role_name": role_name, "created_at": now, "updated_at": now} for role_name in role_names
+    ]).on_conflict_do_nothing(index_elements=["role_name"]))
+
+    role_ids = (await connection.execute(select(UserRole.id).where(UserRole.role_name.in_(role_names)).order_by(UserRole.id))).scalars().all()
+    permission_ids = (await connection.execute(select(Permission.id).order_by(Permission.id))).scalars().all()
+    if not permission_ids:
+        return list(role_ids)
+    links = [
+        {"role_id": role_id, "permission_id": permission_id}
+        for role_id in role_ids
+        for permission_id in rng.sample(permission_ids, rng.randint(1, min(len(permission_ids), 40)))
+    ]
+    await connection.execute(insert(UserRolePermissionLink).values(links).on_conflict_do_nothing(index_elements=["role_id", "permission_id"]))
+    return list(role_ids)
+
+
+async def generate_synthetic_data(
+    users: int,
+    seed: int = 0,
+    roles: int = 20,
+    permissions: int = 100,
+    profile_ratio: float = 0.6,
+    verification_ratio: float = 1.0,
+    batch_size: int = 10000,
+) -> List[LoadStats]:
+    """Loads the synthetic rows in one transaction and analyzes the tables, refused in production."""
+    if config.APP_ENV in PRODUCTION_ENVIRONMENTS:
+        raise RuntimeError(f"refusing to generate synthetic data with APP_ENV={config.APP_ENV}")
+
+    rng = random.Random(seed)
+    rows = {"users": 0, "user_profiles": 0, "user_sign_up_verifications": 0}
+    seconds = dict.fromkeys(rows, 0.0)
+
+    async with engine.begin() as connection:
+        started_at = time.perf_counter()
+        synthetic_role_ids = await generate_roles_and_permissions(rng, connection, roles, permissions)
+        role_stats = LoadStats("user_roles and permissions", roles + permissions, time.perf_counter() - started_at)
+
+        role_ids = dict((await connection.execute(select(UserRole.role_name, UserRole.id))).all())
+        weighted_role_ids, role_weights = get_role_weights(role_ids, synthetic_role_ids)
+        first_id = await reserve_user_ids(connection, users)
+
+        # COPY has to go through the asyncpg connection, it runs in the transaction of this one
+        driver_connection = (await connection.get_raw_connection()).driver_connection
+        batches = generate_user_batches(rng, first_id, users, batch_size, weighted_role_ids, role_weights, profile_ratio, verification_ratio)
+        for batch in batches:
+            for table, columns, records in (
+                ("users", USER_COLUMNS, batch.users),
+                ("user_profiles", PROFILE_COLUMNS, batch.profiles),
+                ("user_sign_up_verifications", VERIFICATION_COLUMNS, batch.verifications),
+            ):
+                if not records:
+                    continue
+                copy_started_at = time.perf_counter()
+                await driver_connection.copy_records_to_table(table, records=records, columns=columns)
+                seconds[table] += time.perf_counter() - copy_started_at
+                rows[table] += len(records)
+            logger.info(f"generated {rows['users']} of {users} users")
+
+    async with engine.begin() as connection:
+        await connection.execute(text("ANALYZE users, user_profiles, user_sign_up_verifications, user_roles, permissions, user_role_permissions"))
+
+    return [role_stats, *[LoadStats(table, rows[table], seconds[table]) for table in rows]]
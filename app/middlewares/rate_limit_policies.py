@@ -0,0 +1,42 @@
+from enum import Enum
+from pydantic import BaseModel, Field
+
+
+class RateLimitKey(str, Enum):
+    IP = "ip"
+    USER = "user"
+
+
+class RateLimitPolicy(BaseModel):
+    path_prefix: str = Field(description="requests whose path starts with this prefix (on a segment boundary) use the policy")
+    max_requests: int = Field(default=20, gt=0, description="requests sustained per time window, the rate the bucket refills at")
+    time_window: int = Field(default=60, gt=0, description="length of the window in seconds")
+    burst: int = Field(default=0, ge=0, description="extra requests a client with a full bucket may send at once, refilled at the sustained rate")
+    key_by: RateLimitKey = Field(default=RateLimitKey.IP, description="what a bucket is shared by, user falls back to ip for anonymous requests")
+    exempt: bool = Field(default=False, description="skip rate limiting entirely")
+
+    @property
+    def limit(self) -> int:
+        """Size of the bucket, the most requests a client can send at once."""
+        return self.max_requests + self.burst
+
+
+class RateLimitRouteTable:
+    """Maps request paths to the policy of their longest matching prefix, one dict probe per segment."""
+
+    def __init__(self, policies: list[RateLimitPolicy], default_policy: RateLimitPolicy) -> None:
+        self.default_policy = default_policy
+        self.routes = {self.normalize(policy.path_prefix): policy for policy in policies}
+
+    @staticmethod
+    def normalize(path: str) -> str:
+        return path.rstrip("/")
+
+    def match(self, path: str) -> RateLimitPolicy:
+        path = self.normalize(path)
+        while path:
+            policy = self.routes.get(path)
+            if policy is not None:
+                return policy
+            path = path.rpartition("/")[0]
+        return self.routes.get("", self.default_policy)
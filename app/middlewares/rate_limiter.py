@@ -1,52 +1,245 @@
+import json
+import math
+import heapq
 import time
-from typing import Awaitable, Callable
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
+from typing import NamedTuple
+from jose import JWTError
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-class RateLimiterMiddleware(BaseHTTPMiddleware):
+from app.common.auth.revocation import revoked_tokens
+from app.common.auth.token import get_verified_payload
+from app.common.auth.token_cache import token_cache
+from app.common.configuration import config
+from app.common.logger import Logger
+from app.connectors.cache.redis import RedisConnector, get_redis_connector
+from app.middlewares.rate_limit_policies import RateLimitKey, RateLimitPolicy, RateLimitRouteTable
 
-    def __init__(self, app: FastAPI, max_requests: int = 100, time_window:int = 100) -> None:
-        super().__init__(app)
+logger = Logger(__name__)
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    remaining: int
+    reset_after: float
+    retry_after: float
+
+
+def get_emission_interval(max_requests: int, time_window: int) -> float:
+    """Seconds it takes the bucket to regain one request at the sustained rate."""
+    return time_window / max_requests
+
+
+def token_bucket_result(allowed: bool, tat: float, current_time: float, emission_interval: float, capacity: int) -> RateLimitResult:
+    """Remaining requests and wait times from the theoretical arrival time (tat) of a client."""
+    delay_tolerance = emission_interval * capacity
+    reset_after = max(tat - current_time, 0)
+    if allowed:
+        remaining = math.floor((delay_tolerance - reset_after) / emission_interval)
+        return RateLimitResult(allowed=True, remaining=max(remaining, 0), reset_after=reset_after, retry_after=0)
+    retry_after = tat + emission_interval - current_time - delay_tolerance
+    return RateLimitResult(allowed=False, remaining=0, reset_after=reset_after, retry_after=max(retry_after, 0))
+
+
+class InMemoryRateLimitBackend:
+    """Per process token bucket (GCRA), idle clients are dropped in the order their buckets fill up."""
+
+    def __init__(self, max_requests: int, time_window: int, burst: int = 0, max_tracked_keys: int = None) -> None:
         self.max_requests = max_requests
         self.time_window = time_window
-        self.requests = {}
+        self.capacity = max_requests + burst
+        self.emission_interval = get_emission_interval(max_requests, time_window)
+        self.max_tracked_keys = max_tracked_keys or config.RATE_LIMIT_MAX_TRACKED_KEYS
+        # key -> theoretical arrival time, when the bucket of the client is full again
+        self.requests: dict[str, float] = {}
+        # (theoretical arrival time, key), entries outdated by a later hit are skipped
+        self.expiries: list[tuple[float, str]] = []
 
-    async def dispatch(self, request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
+    async def hit(self, key: str, current_time: float) -> RateLimitResult:
+        self.evict_idle_keys(current_time=current_time)
 
-        ip_address = request.client.host
-        current_time = time.time()
+        tat = self.requests.get(key)
+        if tat is None:
+            while len(self.requests) >= self.max_tracked_keys:
+                self.pop_first_expiring_key()
+            tat = current_time
 
-        self.register_visit(ip_address=ip_address, current_time=current_time)
-        is_valid_request = self.validate_limits(ip_address=ip_address)
+        new_tat = tat + self.emission_interval
+        allowed = new_tat - current_time <= self.emission_interval * self.capacity
+        if allowed:
+            tat = new_tat
+            self.requests[key] = tat
+            self.push_expiry(key, tat)
+        return token_bucket_result(allowed, tat, current_time, self.emission_interval, self.capacity)
 
-        if not is_valid_request:
-            return JSONResponse(status_code=429, content={"error"  :"Rate limit exceeded"})
+    def push_expiry(self, key: str, tat: float):
+        heapq.heappush(self.expiries, (tat, key))
+        if len(self.expiries) > 2 * len(self.requests) + 1024:
+            self.expiries = [(tat, key) for key, tat in self.requests.items()]
+            heapq.heapify(self.expiries)
 
-        return await call_next(request)
-    
-    def register_visit(self, ip_address :str, current_time : float) :
+    def pop_first_expiring_key(self):
+        tat, key = heapq.heappop(self.expiries)
+        if self.requests.get(key) == tat:
+            del self.requests[key]
 
-        if ip_address not in self.requests:
-            self.requests[ip_address] = []
-        
-        self.requests[ip_address].append(current_time)
-        self.requests[ip_address].sort()
+    def evict_idle_keys(self, current_time: float):
+        while self.expiries and self.expiries[0][0] <= current_time:
+            self.pop_first_expiring_key()
 
-        self.requests[ip_address] = [
-            request_time 
-            for request_time in self.requests[ip_address]
-            if request_time > current_time - self.time_window
-        ]
 
-    def validate_limits(self, ip_address: str):
-        if ip_address not in self.requests:
-            return True
-        
-        requests = self.requests[ip_address]
+class RedisRateLimitBackend:
+    """Cluster wide token bucket, one script per request on the clock of the redis server."""
+
+    TOKEN_BUCKET_SCRIPT = """
+local key = KEYS[1]
+local emission_interval = tonumber(ARGV[1])
+local delay_tolerance = tonumber(ARGV[2])
+local now = redis.call('TIME')
+local current_time = tonumber(now[1]) + tonumber(now[2]) / 1000000
+
+local tat = tonumber(redis.call('GET', key) or '0')
+if tat < current_time then
+    tat = current_time
+end
+
+local new_tat = tat + emission_interval
+-- as strings, redis would truncate lua numbers to integers
+if new_tat - current_time > delay_tolerance then
+    return {0, tostring(tat), tostring(current_time)}
+end
+
+redis.call('SET', key, tostring(new_tat), 'PX', math.ceil((new_tat - current_time) * 1000))
+return {1, tostring(new_tat), tostring(current_time)}
+"""
+
+    def __init__(self, max_requests: int, time_window: int, burst: int = 0, redis_connector: RedisConnector = None) -> None:
+        self.max_requests = max_requests
+        self.time_window = time_window
+        self.capacity = max_requests + burst
+        self.emission_interval = get_emission_interval(max_requests, time_window)
+        self.redis_connector = redis_connector or get_redis_connector()
+        self.script = self.redis_connector.client.register_script(self.TOKEN_BUCKET_SCRIPT)
+
+    def get_bucket_key(self, key: str):
+        return self.redis_connector.get_key(f"rate-limit:{key}")
+
+    async def hit(self, key: str, current_time: float) -> RateLimitResult:
+        """current_time is ignored, the script reads the clock of the redis server."""
+        try:
+            allowed, tat, current_time = await self.script(
+                keys=[self.get_bucket_key(key)],
+                args=[self.emission_interval, self.emission_interval * self.capacity],
+            )
+        except Exception as ex:
+            # an unavailable redis must not take the whole api down with it
+            logger.warning(f"rate limiter could not reach redis, allowing request : {str(ex)}")
+            return RateLimitResult(allowed=True, remaining=self.capacity, reset_after=0, retry_after=0)
+        return token_bucket_result(bool(allowed), float(tat), float(current_time), self.emission_interval, self.capacity)
+
+
+RATE_LIMIT_BACKENDS = {
+    "memory": InMemoryRateLimitBackend,
+    "redis": RedisRateLimitBackend,
+}
+
+
+class RateLimiterMiddleware:
+    """Plain ASGI middleware, limits requests by the policy of their path prefix."""
+
+    RATE_LIMIT_EXCEEDED_BODY = json.dumps({"error": "Rate limit exceeded"}).encode("utf-8")
+
+    def __init__(self, app: ASGIApp, max_requests: int = 100, time_window:int = 100, backend: str = "memory", policies: list[RateLimitPolicy] = None) -> None:
+        self.app = app
+        if backend not in RATE_LIMIT_BACKENDS:
+            raise ValueError(f"unknown rate limit backend {backend}, expected one of {list(RATE_LIMIT_BACKENDS)}")
+
+        default_policy = RateLimitPolicy(path_prefix="", max_requests=max_requests, time_window=time_window)
+        self.route_table = RateLimitRouteTable(policies=policies or [], default_policy=default_policy)
+
+        # every policy counts in its own buckets, keyed by the prefix the route table matched on
+        self.backends = {
+            self.get_policy_key(policy): RATE_LIMIT_BACKENDS[backend](max_requests=policy.max_requests, time_window=policy.time_window, burst=policy.burst)
+            for policy in [default_policy, *self.route_table.routes.values()]
+            if not policy.exempt
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        policy = self.route_table.match(scope["path"])
+        if policy.exempt:
+            await self.app(scope, receive, send)
+            return
+
+        policy_key = self.get_policy_key(policy)
+        key = f"{policy_key}:{self.get_identity(scope, policy)}"
+        result = await self.backends[policy_key].hit(key=key, current_time=time.time())
+        headers = self.get_rate_limit_headers(policy, result)
+
+        if not result.allowed:
+            await self.reject(send, headers)
+            return
+
+        async def send_with_rate_limit_headers(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), *headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_rate_limit_headers)
+
+    def get_policy_key(self, policy: RateLimitPolicy) -> str:
+        return self.route_table.normalize(policy.path_prefix)
+
+    def get_identity(self, scope: Scope, policy: RateLimitPolicy) -> str:
+        if policy.key_by == RateLimitKey.USER:
+            user_id = self.get_user_id(scope)
+            if user_id is not None:
+                return f"user:{user_id}"
+
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    def get_user_id(self, scope: Scope):
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme != "Bearer" or not token:
+                    return None
+                key = token_cache.digest(token)
+                if revoked_tokens.contains(key):
+                    return None
+                try:
+                    payload = get_verified_payload(token, key)
+                    user_id = payload["sub"]
+                except (JWTError, KeyError, TypeError):
+                    # not trusted, count the request against the ip instead
+                    return None
+                # handed to authenticate so the token is decoded once per request
+                scope.setdefault("state", {})["verified_token"] = (token, payload)
+                return user_id
+        return None
+
+    def get_rate_limit_headers(self, policy: RateLimitPolicy, result: RateLimitResult):
+        headers = [
+            (b"ratelimit-limit", str(policy.limit).encode("latin-1")),
+            (b"ratelimit-remaining", str(result.remaining).encode("latin-1")),
+            (b"ratelimit-reset", str(math.ceil(result.reset_after)).encode("latin-1")),
+            (b"ratelimit-policy", f"{policy.max_requests};w={policy.time_window};burst={policy.burst}".encode("latin-1")),
+        ]
+        if not result.allowed:
+            headers.append((b"retry-after", str(math.ceil(result.retry_after)).encode("latin-1")))
+        return headers
 
-        if len(requests) < self.max_requests:
-            return True
-        
-        return False
\ No newline at end of file
+    async def reject(self, send: Send, headers: list):
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(self.RATE_LIMIT_EXCEEDED_BODY)).encode("latin-1")),
+                *headers,
+            ],
+        })
+        await send({"type": "http.response.body", "body": self.RATE_LIMIT_EXCEEDED_BODY})
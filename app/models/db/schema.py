@@ -1,5 +1,6 @@
 from datetime import datetime
 import time
+from sqlalchemy import Index, func, text
 from app.models.db.base import BaseModel
 from sqlmodel import Field, Relationship, SQLModel
 from typing import List, Optional
@@ -7,7 +8,15 @@ from typing import List, Optional
 from app.common.constants import UserSignUpVerificationStatus, UserStatus
 
 class User(BaseModel, table=True):
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        # listing orders and keyset pagination seeks on (sort column, id)
+        Index("ix_users_created_at_id", "created_at", "id"),
+        Index("ix_users_updated_at_id", "updated_at", "id"),
+        Index("ix_users_email_id", "email", "id"),
+        Index("ix_users_first_name_id", "first_name", "id"),
+        Index("ix_users_last_name_id", "last_name", "id"),
+        {"extend_existing": True},
+    )
     __tablename__="users"
 
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -16,16 +25,36 @@ class User(BaseModel, table=True):
     email: str | None = Field(default=None, description="Email of the user",nullable=False, unique=True)
     password : str | None = Field(default=None, nullable=False, exclude=True)
     status: UserStatus | None = Field(default=UserStatus.CREATED, nullable=False)
-    role_id: Optional[int] = Field(default=None, foreign_key="user_roles.id", nullable=False)
+    role_id: Optional[int] = Field(default=None, foreign_key="user_roles.id", nullable=False, index=True)
     role: Optional["UserRole"] = Relationship(back_populates="users")
     profile: Optional["UserProfile"] = Relationship(back_populates="user")
 
     class Config:
         from_attributes = True
 
+
+# "first_name last_name", with '' and ' ' inlined so queries match the index expression exactly
+user_full_name = (
+    func.coalesce(User.__table__.c.first_name, text("''"))
+    .op("||")(text("' '"))
+    .op("||")(func.coalesce(User.__table__.c.last_name, text("''")))
+)
+
+# trigram indexes for ILIKE '%q%', text_pattern_ops for the email prefix LIKE 'q%'
+Index("ix_users_email_trgm", User.__table__.c.email, postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"})
+Index("ix_users_full_name_trgm", user_full_name.label("full_name"), postgresql_using="gin", postgresql_ops={"full_name": "gin_trgm_ops"})
+Index("ix_users_email_prefix", func.lower(User.__table__.c.email).label("lower_email"), postgresql_ops={"lower_email": "text_pattern_ops"})
+# GiST trigram indexes answer ORDER BY email <-> q, the nearest relevance candidates
+Index("ix_users_email_trgm_gist", User.__table__.c.email, postgresql_using="gist", postgresql_ops={"email": "gist_trgm_ops"})
+Index("ix_users_full_name_trgm_gist", user_full_name.label("full_name"), postgresql_using="gist", postgresql_ops={"full_name": "gist_trgm_ops"})
+
     
 class UserSignUpVerification(BaseModel, table=True):
     __tablename__ = "user_sign_up_verifications"
+    __table_args__ = (
+        # verification looks the code up by user and code together
+        Index("ix_user_sign_up_verifications_user_id_verification_code", "user_id", "verification_code"),
+    )
     user_id: Optional[int] = Field(default=None, foreign_key="users.id", nullable=False)
     verification_code: str = Field(nullable=False)
     status: UserSignUpVerificationStatus = Field(default=UserSignUpVerificationStatus.PENDING, nullable=False)
@@ -38,7 +67,7 @@ class UserSignUpVerification(BaseModel, table=True):
 
 class UserProfile(BaseModel, table=True):
     __tablename__ = "user_profiles"
-    user_id: Optional[int] = Field(default=None, foreign_key="users.id", nullable=False)
+    user_id: Optional[int] = Field(default=None, foreign_key="users.id", nullable=False, index=True)
     user: Optional["User"] = Relationship(back_populates="profile")
     profile_picture: str | None = Field(default=None, description="Profile picture of the user",nullable=True)
     bio: str | None = Field(default=None, description="Bio of the user",nullable=True)
@@ -68,10 +97,12 @@ class UserRolePermissionLink(SQLModel, table=True):
         foreign_key="user_roles.id",
         primary_key=True
     )
+    # the primary key (role_id, permission_id) covers lookups by role only
     permission_id: Optional[int] = Field(
         default=None,
         foreign_key="permissions.id",
-        primary_key=True
+        primary_key=True,
+        index=True
     )
 
 
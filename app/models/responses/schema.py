@@ -2,6 +2,7 @@
 from typing import List
 from pydantic import BaseModel, Field
 
+from app.common.constants import CountStrategy
 from app.models.db.schema import Permission, User, UserProfile
 
 
@@ -15,9 +16,13 @@ class UserProfileResponse(BaseModel):
 
 class UserPermissionListResponse(BaseModel):
     permissions : List[Permission] = Field(default=[])
-    total_count : int = Field(default=0)
+    total_count : int | None = Field(default=0)
+    total_pages : int | None = Field(default=None)
     page_size : int = Field(default=10)
-    page_num : int = Field(default=1)
+    page_num : int | None = Field(default=1)
+    next_cursor : str | None = Field(default=None)
+    has_more : bool = Field(default=False)
+    count_strategy : CountStrategy = Field(default=CountStrategy.EXACT, description="how total_count and total_pages were worked out")
 
 
 class UserPermissionCreateResponse(BaseModel):
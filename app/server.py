@@ -1,20 +1,27 @@
-import json
 from fastapi import FastAPI
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from app.api.main import add_api_routes
-from app.common.constants import APP_NAME, APP_DESCRIPTION
+from app.common.auth.permission_index import permission_index, register_permission_index_listener
+from app.common.auth.revocation import register_revocation_listener
+from app.common.cache.response_cache import register_response_cache_listener
+from app.common.configuration import config
+from app.common.constants import API_PREFIX, APP_NAME, APP_DESCRIPTION, APP_VERSION
 from app.common.logger import Logger
-from app.connectors.db.postgres import create_db_and_tables
+from app.common.openapi import configure_openapi
+from app.connectors.cache.redis import get_redis_connector
+from app.connectors.cache.subscriptions import get_redis_subscriber
+from app.connectors.db.migrations import check_database
+from app.connectors.db.postgres import engine
+from app.middlewares.rate_limit_policies import RateLimitKey, RateLimitPolicy
 from app.middlewares.rate_limiter import RateLimiterMiddleware
-from fastapi.openapi.utils import get_openapi
 
 
 logger = Logger(__name__);
 
 def create_app():
     try:
-        app = FastAPI(title=APP_NAME, description=APP_DESCRIPTION)
+        app = FastAPI(title=APP_NAME, description=APP_DESCRIPTION, version=APP_VERSION, openapi_url=None)
         return configure_app(app)
     except Exception as e:
         logger.error(f"Error creating app: {e}")
@@ -23,26 +30,48 @@ def create_app():
 
 def configure_app(app: FastAPI):
     configure_database(app)
+    configure_cache(app)
     configure_routers(app)
     configure_middlewares(app)
-    configure_swagger_json(app)
+    configure_openapi(app)
     return app
 
 
-def configure_swagger_json(app: FastAPI):
+def configure_database(app : FastAPI):
     @app.on_event("startup")
-    def get_swagger_json():
-        # save the swagger.json to the static folder
-        with open("swagger.json", "w") as f:
-            f.write(json.dumps(get_openapi(title=APP_NAME, description=APP_DESCRIPTION, version="1.0.0", routes=app.routes), indent=10))
+    async def on_startup():
+        await check_database()
+        # not caught, without the index every protected route would be denied
+        await permission_index.reload()
+
+    @app.on_event("shutdown")
+    async def on_shutdown():
+        await engine.dispose()
     return app
+    
+def configure_cache(app: FastAPI):
+    register_revocation_listener()
+    register_permission_index_listener()
+    register_response_cache_listener()
+    redis_connector = get_redis_connector()
+    redis_subscriber = get_redis_subscriber()
 
-def configure_database(app : FastAPI):
     @app.on_event("startup")
-    def on_startup():
-        create_db_and_tables()
+    async def on_startup():
+        # every redis path fails open, so the app starts without redis as well
+        try:
+            await redis_connector.connect()
+        except Exception as ex:
+            logger.error(f"could not connect to redis on startup : {str(ex)}")
+        # the subscriber keeps reconnecting in the background
+        await redis_subscriber.start()
+
+    @app.on_event("shutdown")
+    async def on_shutdown():
+        await redis_subscriber.stop()
+        await redis_connector.close()
     return app
-    
+
 def configure_routers(app: FastAPI):
     try:
         add_api_routes(app)
@@ -52,9 +81,20 @@ def configure_routers(app: FastAPI):
     return app
 
 
+RATE_LIMIT_POLICIES = [
+    # load balancer probes must never be throttled
+    RateLimitPolicy(path_prefix=f"{API_PREFIX}/v1/health-check", exempt=True),
+    # credential endpoints stay strict and per ip, the caller is not known yet
+    RateLimitPolicy(path_prefix=f"{API_PREFIX}/v1/users/login", max_requests=5, time_window=60),
+    RateLimitPolicy(path_prefix=f"{API_PREFIX}/v1/users/sign-up", max_requests=5, time_window=60),
+    # everything else under the api is counted per user, so clients behind a NAT do not share a bucket
+    RateLimitPolicy(path_prefix=API_PREFIX, max_requests=100, time_window=60, burst=20, key_by=RateLimitKey.USER),
+]
+
+
 def configure_middlewares(app: FastAPI):
 
     # add the rate limiter middleware
-    app.add_middleware(RateLimiterMiddleware, max_requests=20, time_window=60)
+    app.add_middleware(RateLimiterMiddleware, max_requests=20, time_window=60, backend=config.RATE_LIMIT_BACKEND, policies=RATE_LIMIT_POLICIES)
     return app
 
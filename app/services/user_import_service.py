@@ -0,0 +1,219 @@
+"""
+Bulk user import from an NDJSON or CSV body, read line by line and committed in chunks of
+USER_IMPORT_CHUNK_SIZE rows. CSV bodies start with a header row of CreateUserRequest fields.
+"""
+import csv
+import json
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, List, NamedTuple
+from pydantic import ValidationError
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.common.configuration import config
+from app.common.constants import UserImportFormat, UserSignUpVerificationStatus, UserStatus
+from app.common.logger import Logger
+from app.common.utils import generate_random_string
+from app.connectors.db.postgres import engine
+from app.models.db.schema import UserRole
+from app.models.requests.schema import CreateUserRequest
+
+logger = Logger(__name__)
+
+# a line longer than this is rejected instead of being buffered
+MAX_LINE_BYTES = 64 * 1024
+
+# the errors reported per chunk are capped, the counts are always complete
+MAX_ERRORS_PER_CHUNK = 100
+
+# one array parameter per column, however many rows the chunk has
+INSERT_USERS = text("""
+INSERT INTO users (email, password, first_name, last_name, role_id, status, created_at, updated_at)
+SELECT email, password, first_name, last_name, role_id, CAST(:status AS userstatus), :now, :now
+FROM unnest(
+    CAST(:emails AS text[]), CAST(:passwords AS text[]), CAST(:first_names AS text[]),
+    CAST(:last_names AS text[]), CAST(:role_ids AS integer[])
+) AS rows (email, password, first_name, last_name, role_id)
+ON CONFLICT (email) DO NOTHING
+RETURNING id
+""")
+
+INSERT_VERIFICATIONS = text("""
+INSERT INTO user_sign_up_verifications (user_id, verification_code, status, expires_at, created_at, updated_at)
+SELECT user_id, verification_code, CAST(:status AS usersignupverificationstatus), :expires_at, :now, :now
+FROM unnest(CAST(:user_ids AS integer[]), CAST(:verification_codes AS text[])) AS rows (user_id, verification_code)
+""")
+
+
+class ImportRow(NamedTuple):
+    line: int
+    values: dict | None
+    error: str | None = None
+
+
+class ChunkResult(NamedTuple):
+    chunk: int
+    first_line: int
+    last_line: int
+    rows: int
+    imported: int
+    duplicates: int
+    invalid: int
+    errors: List[dict]
+
+
+def get_import_format(content_type: str | None) -> UserImportFormat:
+    if content_type and content_type.split(";")[0].strip().lower() in ("text/csv", "application/csv"):
+        return UserImportFormat.CSV
+    return UserImportFormat.NDJSON
+
+
+async def read_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, str]]:
+    """(line number, line) pairs of the body, only the current line is buffered."""
+    buffer = b""
+    line_number = 0
+    async for data in stream:
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            yield line_number, line.decode("utf-8", errors="replace").rstrip("\r")
+        if len(buffer) > MAX_LINE_BYTES:
+            raise ValueError(f"line {line_number + 1} is longer than {MAX_LINE_BYTES} bytes")
+    if buffer:
+        yield line_number + 1, buffer.decode("utf-8", errors="replace").rstrip("\r")
+
+
+async def read_ndjson_rows(lines: AsyncIterator[tuple[int, str]]) -> AsyncIterator[ImportRow]:
+    async for line_number, line in lines:
+        if not line.strip():
+            continue
+        try:
+            values = json.loads(line)
+        except ValueError as ex:
+            yield ImportRow(line_number, None, f"invalid json : {str(ex)}")
+            continue
+        if not isinstance(values, dict):
+            yield ImportRow(line_number, None, "expected a json object")
+            continue
+        yield ImportRow(line_number, values)
+
+
+async def read_csv_rows(lines: AsyncIterator[tuple[int, str]]) -> AsyncIterator[ImportRow]:
+    header = None
+    async for line_number, line in lines:
+        if not line.strip():
+            continue
+        cells = next(csv.reader([line]))
+        if header is None:
+            header = [cell.strip() for cell in cells]
+            continue
+        if len(cells) != len(header):
+            yield ImportRow(line_number, None, f"expected {len(header)} columns, got {len(cells)}")
+            continue
+        yield ImportRow(line_number, {name: cell if cell != "" else None for name, cell in zip(header, cells)})
+
+
+def validate_row(row: ImportRow, role_ids: set[int]) -> CreateUserRequest | List[str]:
+    """The validated request, or the errors of the row."""
+    if row.error:
+        return [row.error]
+    try:
+        create_user_request = CreateUserRequest.model_validate(row.values)
+    except ValidationError as ex:
+        return [f"{'.'.join(str(loc) for loc in error['loc'])} : {error['msg']}" for error in ex.errors()]
+    if create_user_request.role_id not in role_ids:
+        return [f"role_id : role {create_user_request.role_id} does not exist"]
+    return create_user_request
+
+
+async def insert_users(connection: AsyncConnection, create_user_requests: List[CreateUserRequest]) -> List[int]:
+    """Inserts the users not already there and a pending sign up verification for each, returns their ids."""
+    now = datetime.now()
+    user_ids = (await connection.execute(INSERT_USERS, {
+        "status": UserStatus.CREATED.name,
+        "now": now,
+        "emails": [request.email for request in create_user_requests],
+        "passwords": [request.password for request in create_user_requests],
+        "first_names": [request.first_name for request in create_user_requests],
+        "last_names": [request.last_name for request in create_user_requests],
+        "role_ids": [request.role_id for request in create_user_requests],
+    })).scalars().all()
+
+    if user_ids:
+        await connection.execute(INSERT_VERIFICATIONS, {
+            "status": UserSignUpVerificationStatus.PENDING.name,
+            "expires_at": now + timedelta(minutes=10),
+            "now": now,
+            "user_ids": list(user_ids),
+            "verification_codes": [generate_random_string(length=32) for _ in user_ids],
+        })
+    return list(user_ids)
+
+
+async def import_chunk(chunk: int, rows: List[ImportRow], role_ids: set[int]) -> ChunkResult:
+    create_user_requests = []
+    errors = []
+    invalid = 0
+    for row in rows:
+        result = validate_row(row, role_ids)
+        if isinstance(result, CreateUserRequest):
+            create_user_requests.append(result)
+            continue
+        invalid += 1
+        if len(errors) < MAX_ERRORS_PER_CHUNK:
+            errors.append({"line": row.line, "errors": result})
+
+    user_ids = []
+    if create_user_requests:
+        async with engine.begin() as connection:
+            # no cache invalidation, the ids are new from the sequence so nothing can be cached for them
+            user_ids = await insert_users(connection, create_user_requests)
+
+    return ChunkResult(
+        chunk=chunk,
+        first_line=rows[0].line,
+        last_line=rows[-1].line,
+        rows=len(rows),
+        imported=len(user_ids),
+        duplicates=len(create_user_requests) - len(user_ids),
+        invalid=invalid,
+        errors=errors,
+    )
+
+
+async def get_chunks(rows: AsyncIterator[ImportRow], chunk_size: int) -> AsyncIterator[List[ImportRow]]:
+    chunk = []
+    async for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def import_users(stream: AsyncIterator[bytes], import_format: UserImportFormat, chunk_size: int = None) -> AsyncIterator[dict[str, Any]]:
+    """Yields the result of every committed chunk, then a summary with "done" false when the import stopped on an error."""
+    totals = {"rows": 0, "imported": 0, "duplicates": 0, "invalid": 0}
+    chunks = 0
+
+    try:
+        async with engine.connect() as connection:
+            role_ids = set((await connection.execute(select(UserRole.id))).scalars().all())
+
+        lines = read_lines(stream)
+        rows = read_csv_rows(lines) if import_format == UserImportFormat.CSV else read_ndjson_rows(lines)
+        async for chunk in get_chunks(rows, chunk_size or config.USER_IMPORT_CHUNK_SIZE):
+            result = await import_chunk(chunks + 1, chunk, role_ids)
+            chunks += 1
+            for key in totals:
+                totals[key] += getattr(result, key)
+            yield result._asdict()
+    except Exception as ex:
+        logger.error(f"user import stopped after {chunks} chunks : {str(ex)}")
+        yield {"done": False, "error": str(ex), "chunks": chunks, **totals}
+        return
+
+    logger.info(f"imported {totals['imported']} of {totals['rows']} users in {chunks} chunks")
+    yield {"done": True, "chunks": chunks, **totals}
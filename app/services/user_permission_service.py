@@ -1,72 +1,92 @@
 from fastapi import HTTPException
-from sqlalchemy import func
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.common.auth.permission_index import role_permissions_changed
+from app.common.cache.response_cache import invalidate_tags
+from app.common.constants import CountStrategy
+from app.common.pagination import Page, count_rows, get_count_strategy, get_next_cursor, seek
 from app.exceptions.database_exceptions import DbException
 from app.models.db.schema import Permission, UserRolePermissionLink
 
 
-async def get_permission_by_id(db: Session, permission_id: int):
+async def get_permission_by_id(db: AsyncSession, permission_id: int):
     try:
-        permission = db.exec(select(Permission).where(Permission.id == permission_id)).first()
+        permission = (await db.exec(select(Permission).where(Permission.id == permission_id))).first()
         return permission
     except Exception as e:
         raise DbException(f"Error getting permission by id: {e}")
     
 
-async def create_permission(db: Session, permission: Permission):
+async def create_permission(db: AsyncSession, permission: Permission):
     try:
-        existing_permission = db.exec(select(Permission).where(Permission.permission_name == permission.permission_name)).first()
+        existing_permission = (await db.exec(select(Permission).where(Permission.permission_name == permission.permission_name))).first()
         if existing_permission:
             raise HTTPException(status_code=400, detail=f"Permission with name {permission.permission_name} already exists")
         
         db.add(permission)
-        db.commit()
-        db.refresh(permission)
+        await db.commit()
+        await role_permissions_changed()
+        await invalidate_tags(["permissions", "roles"])
+        await db.refresh(permission)
         return permission
     except Exception as e:
         raise DbException(f"Error creating permission: {e}")
     
 
-async def update_permission(db: Session, permission_id: int, permission: Permission):
+async def update_permission(db: AsyncSession, permission_id: int, permission: Permission):
     try:
-        existing_permission = db.exec(select(Permission).where(Permission.id == permission_id)).first()
+        existing_permission = (await db.exec(select(Permission).where(Permission.id == permission_id))).first()
         if not existing_permission:
             raise HTTPException(status_code=404, detail=f"Permission with id {permission_id} does not exist")
         
         existing_permission.permission_name = permission.permission_name
-        db.commit()
-        db.refresh(existing_permission)
+        await db.commit()
+        await role_permissions_changed()
+        await invalidate_tags(["permissions", "roles"])
+        await db.refresh(existing_permission)
         return existing_permission
     except Exception as e:
         raise DbException(f"Error updating permission: {e}")
     
 
-async def delete_permission(db: Session, permission_id: int):
+async def delete_permission(db: AsyncSession, permission_id: int):
     try:
-        permission = db.exec(select(Permission).where(Permission.id == permission_id)).first()
+        permission = (await db.exec(select(Permission).where(Permission.id == permission_id))).first()
         if not permission:
             raise HTTPException(status_code=404, detail=f"Permission with id {permission_id} does not exist")
         
-        db.delete(permission)
-        db.commit()
+        await db.delete(permission)
+        await db.commit()
+        await role_permissions_changed()
+        await invalidate_tags(["permissions", "roles"])
         return True
     except Exception as e:
         raise DbException(f"Error deleting permission: {e}")
 
 
-async def get_all_permissions(db: Session, page_num: int, page_size: int):
+async def get_all_permissions(db: AsyncSession, page_num: int, page_size: int, cursor: str | None = None, count_strategy: CountStrategy | None = None) -> Page:
+    """Permissions ordered by id, paged by offset or by cursor."""
+    count_strategy = get_count_strategy(count_strategy, cursor)
     try:
-        permissions = db.exec(select(Permission).offset((page_num - 1) * page_size).limit(page_size)).all()
-        permission_count_result = db.exec(select(func.count()).select_from(Permission))
-        permission_count = permission_count_result.one()
-        return permissions, permission_count
+        statement = select(Permission)
+        permission_count = await count_rows(db, statement, count_strategy)
+
+        statement = statement.order_by(Permission.id)
+        if cursor:
+            statement = seek(statement, Permission.id, Permission.id, "asc", cursor, "id")
+        else:
+            statement = statement.offset((page_num - 1) * page_size)
+
+        permissions = (await db.exec(statement.limit(page_size + 1))).all()
+        next_cursor = get_next_cursor(permissions, page_size, "id", "asc")
+        return Page(items=permissions[:page_size], total_count=permission_count, next_cursor=next_cursor, has_more=len(permissions) > page_size, count_strategy=count_strategy)
     except Exception as e:
         raise DbException(f"Error getting all permissions: {e}")
     
 
-async def get_permission_by_user_role(db: Session, user_role_id: int):
+async def get_permission_by_user_role(db: AsyncSession, user_role_id: int):
     try:
-        permissions = db.exec(select(Permission).join(UserRolePermissionLink).where(UserRolePermissionLink.role_id == user_role_id)).all()
+        permissions = (await db.exec(select(Permission).join(UserRolePermissionLink).where(UserRolePermissionLink.role_id == user_role_id))).all()
         return permissions
     except Exception as e:
         raise DbException(f"Error getting permission by user role: {e}")
\ No newline at end of file
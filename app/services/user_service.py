@@ -1,14 +1,18 @@
 from datetime import datetime, timedelta
 from typing import List
-from sqlmodel import Session, select
-from sqlalchemy import func
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import Float, case, func, literal, or_, union_all
+from app.common.auth.revocation import revoke_token
+from app.common.auth.token import get_verified_payload, user_role_changed
+from app.common.cache.response_cache import invalidate_tags
 from app.common.logger import Logger
+from app.common.pagination import Page, count_rows, get_count_strategy, get_next_cursor, get_sort_direction, order_by_keyset, seek
 from app.common.utils import generate_random_string
-from app.connectors.cache.redis import get_redis_connector
 from app.exceptions.database_exceptions import DbException
 from app.models.requests.schema import CreateUserRequest, LoginRequest, UpdatePasswordRequest
-from app.models.db.schema import User, UserSignUpVerification
-from app.common.constants import UserSignUpVerificationStatus, UserStatus
+from app.models.db.schema import User, UserSignUpVerification, user_full_name
+from app.common.constants import CountStrategy, UserSignUpVerificationStatus, UserStatus
 from app.services import user_role_service
 
 logger = Logger(__name__)
@@ -19,34 +23,34 @@ class ListFilters :
     q : str = ""
 
 
-async def get_user(db: Session, user_id : int) -> User :
+async def get_user(db: AsyncSession, user_id : int) -> User :
     try:
-        users = db.exec(select(User).where(User.id == user_id)).all()
+        users = (await db.exec(select(User).where(User.id == user_id))).all()
         return users[0]
     except Exception:
         raise Exception("Error occurred while fetching user from database")
     return None
 
 
-async def get_user_by_email(db: Session, email: str): 
+async def get_user_by_email(db: AsyncSession, email: str): 
     try:
-        users = db.exec(select(User).where(User.email == email)).all()
+        users = (await db.exec(select(User).where(User.email == email))).all()
         return users[0]
     except Exception:
         raise Exception("Error occurred while fetching user from db")
     return None
 
 
-async def login_user(db: Session, login_request : LoginRequest):
+async def login_user(db: AsyncSession, login_request : LoginRequest):
     try:
-        users = db.exec(select(User).where(User.email == login_request.email and User.password == login_request.password)).all()
+        users = (await db.exec(select(User).where(User.email == login_request.email, User.password == login_request.password))).all()
         return users[0]
     except Exception:
         raise Exception("Error occurred while fetching user from db")
     return None
 
 
-async def update_password(db: Session, user_id: int, update_password_request: UpdatePasswordRequest) -> User:
+async def update_password(db: AsyncSession, user_id: int, update_password_request: UpdatePasswordRequest) -> User:
     try:
         user = await get_user(db=db, user_id=user_id)
         if not user:
@@ -56,14 +60,15 @@ async def update_password(db: Session, user_id: int, update_password_request: Up
             raise Exception("Existing passwords does not match")
         
         user.password = update_password_request.new_password
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await invalidate_tags([f"user:{user_id}"])
+        await db.refresh(user)
         return user
     except Exception:
         raise DbException("Exception occurred while updating password")
 
 
-async def create_user(db: Session, create_user_request: CreateUserRequest) -> User:
+async def create_user(db: AsyncSession, create_user_request: CreateUserRequest) -> User:
     """
     Create a new user from the request data
     
@@ -104,8 +109,9 @@ async def create_user(db: Session, create_user_request: CreateUserRequest) -> Us
         )
 
         db.add(user_sign_up_verification)
-        db.commit()
-        db.refresh(user_sign_up_verification)
+        await db.commit()
+        await db.refresh(user_sign_up_verification)
+        await invalidate_tags([f"user:{user.id}", f"profile:{user.id}"])
         
         logger.info(f"Successfully created user with email: {user.email}")
         return user
@@ -115,37 +121,137 @@ async def create_user(db: Session, create_user_request: CreateUserRequest) -> Us
         raise e
     except Exception as ex:
         logger.error(f"Error creating user: {str(ex)}")
-        db.rollback()
+        await db.rollback()
         raise ex
 
 
-async def list_users(db: Session, q: str, sort_dir : str , sort_column : str , page_num: int = 1, page_size: int = 10):
+# shorter terms only match the email prefix
+MIN_TRIGRAM_SEARCH_LENGTH = 3
+
+RELEVANCE = "relevance"
+
+RELEVANCE_SIMILARITY_THRESHOLD = 0.3
+# relevance only ranks this many candidates
+MAX_RELEVANCE_CANDIDATES = 1000
+
+# every one has a (column, id) index
+USER_SORT_COLUMNS = {
+    "id": User.id,
+    "first_name": User.first_name,
+    "last_name": User.last_name,
+    "email": User.email,
+    "created_at": User.created_at,
+    "updated_at": User.updated_at,
+}
+
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def get_search_filter(q: str):
+    """Email prefix match, plus substring matches on the email and full name for longer terms."""
+    pattern = escape_like(q.lower())
+    conditions = [func.lower(User.email).like(f"{pattern}%")]
+    if len(q) >= MIN_TRIGRAM_SEARCH_LENGTH:
+        conditions.append(User.email.ilike(f"%{pattern}%"))
+        conditions.append(user_full_name.ilike(f"%{pattern}%"))
+    return or_(*conditions)
+
+
+def get_relevance_candidates(q: str):
+    """Ids of the exact and prefix email matches, then of the emails and full names closest to q."""
+    lower_email = func.lower(User.email)
+    candidates = [
+        select(User.id, literal(-1.0, Float).label("distance")).where(lower_email == q.lower()),
+        select(User.id, literal(0.0, Float).label("distance")).where(lower_email.like(f"{escape_like(q.lower())}%")).limit(MAX_RELEVANCE_CANDIDATES),
+    ]
+    if len(q) >= MIN_TRIGRAM_SEARCH_LENGTH:
+        for column in (User.email, user_full_name):
+            distance = column.op("<->", return_type=Float)(q)
+            candidates.append(
+                select(User.id, distance.label("distance")).where(column.op("%")(q)).order_by(distance).limit(MAX_RELEVANCE_CANDIDATES)
+            )
+    candidates = union_all(*candidates).subquery()
+    return select(candidates.c.id).order_by(candidates.c.distance).limit(MAX_RELEVANCE_CANDIDATES)
+
+
+async def set_similarity_threshold(db: AsyncSession, threshold: float):
+    """Threshold of the % operator for the rest of the transaction."""
+    await db.exec(select(func.set_config("pg_trgm.similarity_threshold", str(threshold), True)))
+
+
+def get_search_rank(q: str):
+    """Exact email, then email prefix, then by trigram similarity of the email or the full name."""
+    lower_email = func.lower(User.email)
+    return case(
+        (lower_email == q.lower(), 2),
+        (lower_email.like(f"{escape_like(q.lower())}%"), 1),
+        else_=0,
+    ) + func.greatest(func.similarity(User.email, q), func.similarity(user_full_name, q))
+
+
+async def list_users(db: AsyncSession, q: str, sort_dir : str , sort_column : str | None , page_num: int = 1, page_size: int = 10, cursor: str | None = None, count_strategy: CountStrategy | None = None) -> Page:
+    """Lists users by keyset seek when a cursor is given and by offset otherwise, searches default to relevance order."""
+    q = (q or "").strip()
+    sort_column = sort_column or (RELEVANCE if q else "id")
+    if sort_column == RELEVANCE:
+        if not q:
+            raise DbException("sorting by relevance needs a search term")
+        if cursor:
+            raise DbException("cursor pagination is not supported when sorting by relevance")
+    elif sort_column not in USER_SORT_COLUMNS:
+        raise DbException(f"invalid sort column {sort_column}, expected one of {[*USER_SORT_COLUMNS, RELEVANCE]}")
+    sort_dir = get_sort_direction(sort_dir)
+    column = USER_SORT_COLUMNS.get(sort_column)
+    if cursor and column.nullable:
+        raise DbException(f"cursor pagination is not supported on the nullable column {sort_column}")
+    # the relevance candidates are capped, their count is not the number of matches
+    count_strategy = CountStrategy.NONE if sort_column == RELEVANCE else get_count_strategy(count_strategy, cursor)
+
     try:
-        offset = (page_num-1) * page_size
-        limit = page_size
+        statement = select(User)
+        if sort_column == RELEVANCE:
+            await set_similarity_threshold(db, RELEVANCE_SIMILARITY_THRESHOLD)
+            statement = statement.where(User.id.in_(get_relevance_candidates(q)))
+        elif q:
+            statement = statement.where(get_search_filter(q))
+        user_count = await count_rows(db, statement, count_strategy)
+
+        if sort_column == RELEVANCE:
+            # most relevant first whatever sort_dir says
+            statement = statement.order_by(get_search_rank(q).desc(), User.id.asc())
+        else:
+            statement = order_by_keyset(statement, column, User.id, sort_dir)
 
-        user_count_result = db.exec(select(func.count()).select_from(User))
-        user_count = user_count_result.one()
+        if cursor:
+            statement = seek(statement, column, User.id, sort_dir, cursor, sort_column, q)
+        else:
+            statement = statement.offset((page_num-1) * page_size)
 
-        users_result = db.exec(select(User).offset(offset).limit(limit).order_by(sort_column)).all()
-        users = [user.model_dump() for user in users_result]
+        # one extra row tells whether there is a next page
+        users_result = (await db.exec(statement.limit(page_size + 1))).all()
+        next_cursor = get_next_cursor(users_result, page_size, sort_column, sort_dir, q) if column is not None and not column.nullable else None
+        users = [user.model_dump() for user in users_result[:page_size]]
 
-        return user_count, users
+        return Page(items=users, total_count=user_count, next_cursor=next_cursor, has_more=len(users_result) > page_size, count_strategy=count_strategy)
+    except DbException as ex:
+        raise ex
     except Exception:
         raise DbException("Exception occurred while fetching user list from database")
 
 
 async def logout(token : str):
     try:
-        redis_connector = get_redis_connector()
-        await redis_connector.write(token, True, ttl=60 * 60 * 24 * 14)
+        payload = get_verified_payload(token)
+        await revoke_token(token=token, payload=payload)
         return True
     except Exception as ex:
         logger.error(f"error occurred while logging out user : {str(ex)}")
         raise DbException(f"error occurred while logging out user : {str(ex)}")
     
 
-async def update_user_role(db: Session, user_id: int, role_id: int):
+async def update_user_role(db: AsyncSession, user_id: int, role_id: int):
     try:
         user = await get_user(db=db, user_id=user_id)
         if not user:
@@ -157,17 +263,21 @@ async def update_user_role(db: Session, user_id: int, role_id: int):
         
         user.role_id = role_id
         db.add(user)
-        db.commit()
-        db.refresh(user)
-        return user
+        await db.commit()
+        await db.refresh(user)
     except Exception:
         raise DbException("Exception occurred while updating user role")
+
+    # the user's outstanding tokens still carry the old role
+    await user_role_changed(user_id=user_id, role_id=role_id)
+    await invalidate_tags([f"user:{user_id}"])
+    return user
     
 
-async def verify_user_sign_up(db: Session, user_id: int, verification_code: str) -> User:
+async def verify_user_sign_up(db: AsyncSession, user_id: int, verification_code: str) -> User:
     try:
-        user_sign_up_verification = db.exec(select(UserSignUpVerification).where(UserSignUpVerification.user_id == user_id and UserSignUpVerification.verification_code == verification_code)).one()
-        user = db.exec(select(User).where(User.id == user_id)).one()
+        user_sign_up_verification = (await db.exec(select(UserSignUpVerification).where(UserSignUpVerification.user_id == user_id, UserSignUpVerification.verification_code == verification_code))).one()
+        user = (await db.exec(select(User).where(User.id == user_id))).one()
 
         if not user:
             raise Exception(f"User with id {user_id} not found")
@@ -186,13 +296,14 @@ async def verify_user_sign_up(db: Session, user_id: int, verification_code: str)
         
         if user_sign_up_verification.expires_at < datetime.now():
             user_sign_up_verification.status = UserSignUpVerificationStatus.EXPIRED
-            db.commit()
-            db.refresh(user_sign_up_verification)
+            await db.commit()
+            await db.refresh(user_sign_up_verification)
             raise Exception(f"User with id {user_id} verification code expired")
         
         user_sign_up_verification.status = UserSignUpVerificationStatus.VERIFIED
-        db.commit()
-        db.refresh(user_sign_up_verification)
+        await db.commit()
+        await invalidate_tags([f"user:{user_id}"])
+        await db.refresh(user_sign_up_verification)
         return user
     except Exception:
         raise DbException("Exception occurred while verifying user sign up")
\ No newline at end of file
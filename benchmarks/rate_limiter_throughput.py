@@ -0,0 +1,93 @@
+"""
+Throughput of the rate limiter middleware, BaseHTTPMiddleware vs plain ASGI.
+
+    python -m benchmarks.rate_limiter_throughput --requests 20000 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.middlewares.rate_limiter import RATE_LIMIT_BACKENDS, RateLimiterMiddleware
+from app.server import configure_routers
+
+
+class BaseHTTPRateLimiterMiddleware(BaseHTTPMiddleware):
+    """The previous implementation of RateLimiterMiddleware, kept here for comparison."""
+
+    def __init__(self, app: FastAPI, max_requests: int = 100, time_window: int = 100, backend: str = "memory") -> None:
+        super().__init__(app)
+        self.backend = RATE_LIMIT_BACKENDS[backend](max_requests=max_requests, time_window=time_window)
+
+    async def dispatch(self, request: Request, call_next):
+        result = await self.backend.hit(key=request.client.host, current_time=time.time())
+        if not result.allowed:
+            return JSONResponse(status_code=429, content={"error": "Rate limit exceeded"})
+        return await call_next(request)
+
+
+def build_app(middleware_class) -> FastAPI:
+    app = FastAPI()
+    configure_routers(app)
+    app.add_middleware(middleware_class, max_requests=10**9, time_window=60)
+    return app
+
+
+async def call(app: FastAPI, path: str):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"benchmark")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("benchmark", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise RuntimeError(f"unexpected status {message['status']}")
+
+    await app(scope, receive, send)
+
+
+async def measure(app: FastAPI, path: str, requests: int, concurrency: int) -> float:
+    async def worker(count: int):
+        for _ in range(count):
+            await call(app, path)
+
+    # warm up the route and the middleware stack before timing
+    await worker(200)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*[worker(requests // concurrency) for _ in range(concurrency)])
+    return (requests // concurrency) * concurrency / (time.perf_counter() - started_at)
+
+
+async def main(requests: int, concurrency: int, path: str):
+    results = {}
+    for name, middleware_class in [("BaseHTTPMiddleware", BaseHTTPRateLimiterMiddleware), ("pure ASGI", RateLimiterMiddleware)]:
+        results[name] = await measure(build_app(middleware_class), path, requests, concurrency)
+        print(f"{name:<20} {results[name]:>10.0f} req/s")
+
+    baseline = results["BaseHTTPMiddleware"]
+    print(f"{'speedup':<20} {results['pure ASGI'] / baseline:>10.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--path", default="/api/v1/health-check")
+    args = parser.parse_args()
+    asyncio.run(main(requests=args.requests, concurrency=args.concurrency, path=args.path))
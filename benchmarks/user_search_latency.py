@@ -0,0 +1,58 @@
+"""
+User search latency percentiles against the configured database, for the 50ms p99 target.
+
+    python manage.py generate-data --users 1000000 --seed 42
+    python -m benchmarks.user_search_latency --iterations 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.connectors.db.postgres import async_session_maker
+from app.services import user_service
+
+SEARCHES = [
+    {"q": "james", "sort_column": None},
+    {"q": "smith", "sort_column": None},
+    {"q": "mary.garcia", "sort_column": None},
+    {"q": "ja", "sort_column": None},
+    {"q": "wang", "sort_column": "created_at"},
+    {"q": "patel", "sort_column": "email", "page_num": 20},
+]
+
+
+def get_percentile(durations: list[float], percentile: float) -> float:
+    return statistics.quantiles(durations, n=100, method="inclusive")[int(percentile) - 1]
+
+
+async def measure(search: dict, iterations: int) -> list[float]:
+    durations = []
+    for iteration in range(iterations + 10):
+        async with async_session_maker() as db:
+            started_at = time.perf_counter()
+            await user_service.list_users(db, q=search["q"], sort_dir="asc", sort_column=search["sort_column"], page_num=search.get("page_num", 1))
+            # the first runs only warm up the connections and the plans
+            if iteration >= 10:
+                durations.append((time.perf_counter() - started_at) * 1000)
+    return durations
+
+
+async def main(iterations: int):
+    print(f"{'q':<14} {'sort':<12} {'page':>5} {'p50 ms':>9} {'p99 ms':>9}")
+    all_durations = []
+    for search in SEARCHES:
+        durations = await measure(search, iterations)
+        all_durations.extend(durations)
+        print(
+            f"{search['q']:<14} {search['sort_column'] or 'relevance':<12} {search.get('page_num', 1):>5} "
+            f"{statistics.median(durations):>9.1f} {get_percentile(durations, 99):>9.1f}"
+        )
+    print(f"{'all':<32} {statistics.median(all_durations):>9.1f} {get_percentile(all_durations, 99):>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(iterations=args.iterations))
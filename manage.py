@@ -0,0 +1,162 @@
+"""
+Management commands, run from the repository root.
+
+    python manage.py migrate [--target VERSION] [--skip-seed]
+    python manage.py migration-status
+    python manage.py explain-check [--min-rows ROWS] [--analyze]
+    python manage.py openapi [--output PATH] [--indent SPACES]
+    python manage.py routes [--check]
+    python manage.py profile-imports [--module MODULE] [--top COUNT]
+    python manage.py generate-data --users COUNT [--seed SEED] [--roles COUNT] [--permissions COUNT] [--batch-size ROWS]
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from app.api.main import ROUTE_MANIFEST_PATH, is_route_manifest_current, write_route_manifest
+from app.common.import_profile import get_package_times, profile_imports
+from app.common.openapi import OpenApiDocument
+from app.connectors.db.explain_check import explain_check
+from app.connectors.db.migrations import get_applied_versions, get_current_version, load_migrations, migrate
+from app.connectors.db.postgres import engine, seed_database
+from app.connectors.db.synthetic import generate_synthetic_data
+from app.server import create_app
+
+
+async def run_migrate(args: argparse.Namespace):
+    await migrate(target_version=args.target)
+    if not args.skip_seed:
+        await seed_database()
+
+
+async def run_migration_status(args: argparse.Namespace):
+    current_version = await get_current_version()
+    applied_versions = set()
+    if current_version:
+        async with engine.connect() as connection:
+            applied_versions = await get_applied_versions(connection)
+
+    print(f"schema version {current_version}")
+    for migration in load_migrations():
+        state = "applied" if migration.version in applied_versions else "pending"
+        print(f"{migration.version:>6}  {state:<8} {migration.name} : {migration.description}")
+
+
+async def run_explain_check(args: argparse.Namespace):
+    plans, failures = await explain_check(min_rows=args.min_rows, analyze=args.analyze)
+    for plan in plans:
+        print(f"{plan.call:<55} {plan.plan['Node Type']:<20} cost {plan.plan['Total Cost']}")
+    for failure in failures:
+        print(f"FAILED {failure}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+async def run_openapi(args: argparse.Namespace):
+    OpenApiDocument(create_app()).write(args.output, indent=args.indent)
+    print(f"wrote the openapi schema to {args.output}")
+
+
+async def run_routes(args: argparse.Namespace):
+    if args.check:
+        if not is_route_manifest_current():
+            print(f"{ROUTE_MANIFEST_PATH} is out of date, run `python manage.py routes`", file=sys.stderr)
+            sys.exit(1)
+        print(f"{ROUTE_MANIFEST_PATH} is up to date")
+        return
+    print(f"wrote the route manifest to {write_route_manifest()}")
+
+
+async def run_profile_imports(args: argparse.Namespace):
+    import_times = profile_imports(args.module)
+    total_us = sum(import_time.self_us for import_time in import_times)
+    print(f"importing {args.module} took {total_us / 1000:.1f} ms over {len(import_times)} modules\n")
+
+    print(f"{'package':<40} {'self ms':>10}")
+    package_times = sorted(get_package_times(import_times).items(), key=lambda item: item[1], reverse=True)
+    for package, self_us in package_times[:args.top]:
+        print(f"{package:<40} {self_us / 1000:>10.1f}")
+
+    print(f"\n{'module':<60} {'self ms':>10} {'cumulative ms':>15}")
+    for import_time in sorted(import_times, key=lambda import_time: import_time.cumulative_us, reverse=True)[:args.top]:
+        print(f"{import_time.module:<60} {import_time.self_us / 1000:>10.1f} {import_time.cumulative_us / 1000:>15.1f}")
+
+
+async def run_generate_data(args: argparse.Namespace):
+    started_at = time.perf_counter()
+    load_stats = await generate_synthetic_data(
+        users=args.users,
+        seed=args.seed,
+        roles=args.roles,
+        permissions=args.permissions,
+        profile_ratio=args.profile_ratio,
+        verification_ratio=args.verification_ratio,
+        batch_size=args.batch_size,
+    )
+    elapsed = time.perf_counter() - started_at
+
+    print(f"{'table':<30} {'rows':>12} {'seconds':>10} {'rows/s':>12}")
+    for stats in load_stats:
+        print(f"{stats.table:<30} {stats.rows:>12} {stats.seconds:>10.2f} {stats.rows_per_second:>12.0f}")
+    total_rows = sum(stats.rows for stats in load_stats)
+    # the total includes generating the rows in python and analyzing the tables
+    print(f"{'total':<30} {total_rows:>12} {elapsed:>10.2f} {total_rows / elapsed:>12.0f}")
+
+
+COMMANDS = {
+    "migrate": run_migrate,
+    "migration-status": run_migration_status,
+    "explain-check": run_explain_check,
+    "openapi": run_openapi,
+    "routes": run_routes,
+    "profile-imports": run_profile_imports,
+    "generate-data": run_generate_data,
+}
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="apply pending schema migrations, then seed the default data")
+    migrate_parser.add_argument("--target", type=int, default=None, help="stop after this version, default is the latest")
+    migrate_parser.add_argument("--skip-seed", action="store_true", help="only migrate the schema")
+
+    subparsers.add_parser("migration-status", help="list the migrations and whether they are applied")
+
+    explain_parser = subparsers.add_parser("explain-check", help="EXPLAIN the service queries, fail on sequential scans of large tables")
+    explain_parser.add_argument("--min-rows", type=int, default=10000, help="tables estimated to hold fewer rows may be scanned sequentially")
+    explain_parser.add_argument("--analyze", action="store_true", help="ANALYZE the database first so the estimates are current")
+
+    openapi_parser = subparsers.add_parser("openapi", help="write the openapi schema of the app to a file")
+    openapi_parser.add_argument("--output", default="swagger.json", help="default is swagger.json")
+    openapi_parser.add_argument("--indent", type=int, default=2)
+
+    routes_parser = subparsers.add_parser("routes", help="regenerate app/api/routes.py from the modules under app/api")
+    routes_parser.add_argument("--check", action="store_true", help="only fail if the manifest is out of date, for CI")
+
+    profile_parser = subparsers.add_parser("profile-imports", help="report the slowest imports of the app")
+    profile_parser.add_argument("--module", default="main", help="module to import, default is main")
+    profile_parser.add_argument("--top", type=int, default=20)
+
+    generate_parser = subparsers.add_parser("generate-data", help="load synthetic users, profiles, verifications, roles and permissions")
+    generate_parser.add_argument("--users", type=int, required=True)
+    generate_parser.add_argument("--seed", type=int, default=0, help="the same seed generates the same rows")
+    generate_parser.add_argument("--roles", type=int, default=20, help="synthetic roles besides the seeded ones")
+    generate_parser.add_argument("--permissions", type=int, default=100, help="synthetic permissions besides the seeded ones")
+    generate_parser.add_argument("--profile-ratio", type=float, default=0.6, help="share of the users with a profile")
+    generate_parser.add_argument("--verification-ratio", type=float, default=1.0, help="share of the users with a sign up verification")
+    generate_parser.add_argument("--batch-size", type=int, default=10000, help="rows per COPY")
+    return parser
+
+
+async def main(args: argparse.Namespace):
+    try:
+        await COMMANDS[args.command](args)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(get_parser().parse_args()))
@@ -0,0 +1,19 @@
+import os
+import pytest
+
+from dotenv import dotenv_values
+
+# tests that need postgres only run against a database set in the environment, never the example one
+DATABASE_CONFIGURED = "DB_HOST" in os.environ
+
+# the settings are read from the environment on import, fall back to the example values
+ENV_EXAMPLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env.example")
+
+for key, value in dotenv_values(ENV_EXAMPLE_PATH).items():
+    os.environ.setdefault(key, value)
+
+
+@pytest.fixture
+def database():
+    if not DATABASE_CONFIGURED:
+        pytest.skip("no database configured, set DB_HOST and the other DB_ settings")
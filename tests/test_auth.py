@@ -0,0 +1,90 @@
+import asyncio
+import time
+import uuid
+import pytest
+from fastapi import HTTPException
+
+from app.common.auth import token
+from app.common.auth.revocation import RevokedTokenSet, on_revocation_message, revoked_tokens
+from app.common.auth.token_cache import VerifiedTokenCache, token_cache
+
+
+def get_token(expires_in: int = 60) -> tuple[str, dict]:
+    issued_at = int(time.time())
+    payload = {"sub": "1", "iat": issued_at, "exp": issued_at + expires_in, "jti": uuid.uuid4().hex, "role": 1, "perms": 1}
+    return token.encrypt_token(payload), payload
+
+
+def test_token_cache_entries_expire_with_the_token(monkeypatch):
+    cache = VerifiedTokenCache(max_size=10)
+    cache.put("key", {"sub": "1"}, expires_at=1000.0)
+
+    monkeypatch.setattr(time, "time", lambda: 999.0)
+    assert cache.get("key") == {"sub": "1"}
+    monkeypatch.setattr(time, "time", lambda: 1000.0)
+    assert cache.get("key") is None
+    assert "key" not in cache.entries
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_token_cache_drops_the_least_recently_used_token():
+    cache = VerifiedTokenCache(max_size=2)
+    expires_at = time.time() + 60
+    cache.put("first", {}, expires_at)
+    cache.put("second", {}, expires_at)
+    cache.get("first")
+    cache.put("third", {}, expires_at)
+
+    assert list(cache.entries) == ["first", "third"]
+
+
+def test_revoked_tokens_are_forgotten_once_expired(monkeypatch):
+    revoked = RevokedTokenSet()
+    revoked.add("key", expires_at=1000.0)
+
+    monkeypatch.setattr(time, "time", lambda: 999.0)
+    assert revoked.contains("key")
+    monkeypatch.setattr(time, "time", lambda: 1000.0)
+    assert not revoked.contains("key")
+
+
+def test_token_revoked_on_another_worker_is_rejected(monkeypatch):
+    async def is_revoked_in_redis(key, payload):
+        return False
+
+    monkeypatch.setattr(token, "is_revoked_in_redis", is_revoked_in_redis)
+    value, payload = get_token()
+    assert asyncio.run(token.get_authenticated_payload(value)) == payload
+    assert token_cache.get(token_cache.digest(value)) == payload
+
+    # the broadcast of the revocation drops the cached payload as well
+    on_revocation_message({"key": token_cache.digest(value), "expires_at": payload["exp"]})
+    with pytest.raises(HTTPException) as ex:
+        asyncio.run(token.get_authenticated_payload(value))
+    assert ex.value.status_code == 401
+    assert token_cache.get(token_cache.digest(value)) is None
+
+
+def test_token_revoked_in_redis_is_rejected_and_remembered(monkeypatch):
+    lookups = []
+
+    async def is_revoked_in_redis(key, payload):
+        lookups.append(key)
+        revoked_tokens.add(key, payload["exp"])
+        return True
+
+    monkeypatch.setattr(token, "is_revoked_in_redis", is_revoked_in_redis)
+    value, _ = get_token()
+    for _ in range(2):
+        with pytest.raises(HTTPException) as ex:
+            asyncio.run(token.get_authenticated_payload(value))
+        assert ex.value.status_code == 401
+    assert len(lookups) == 1
+
+
+def test_expired_token_is_rejected():
+    value, _ = get_token(expires_in=-10)
+
+    with pytest.raises(HTTPException) as ex:
+        asyncio.run(token.get_authenticated_payload(value))
+    assert ex.value.status_code == 401
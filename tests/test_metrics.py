@@ -0,0 +1,13 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1 import metrics
+
+
+@pytest.mark.parametrize("path", ["/metrics/db-pool", "/metrics/token-cache", "/metrics/redis-pool"])
+def test_metrics_need_a_token(path):
+    app = FastAPI()
+    app.include_router(metrics.router)
+
+    assert TestClient(app).get(path).status_code in (401, 403)
@@ -0,0 +1,51 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.common.openapi import OPENAPI_URL, accepts_encoding, configure_openapi
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip", True),
+    ("br, gzip;q=0.5", True),
+    ("*", True),
+    ("br, *;q=0.1", True),
+    ("gzip;q=0", False),
+    ("gzip; q=0.000, br", False),
+    ("*;q=0", False),
+    ("gzip;q=0, *", False),
+    ("identity", False),
+    ("", False),
+    (None, False),
+])
+def test_accepts_gzip_by_q_value(accept_encoding, expected):
+    assert accepts_encoding(accept_encoding, "gzip") is expected
+
+
+def get_client() -> TestClient:
+    app = FastAPI(openapi_url=None)
+
+    @app.get("/items")
+    def items():
+        return []
+
+    configure_openapi(app)
+    return TestClient(app)
+
+
+def test_gzip_and_identity_have_their_own_etag():
+    client = get_client()
+    gzip_response = client.get(OPENAPI_URL, headers={"Accept-Encoding": "gzip"})
+    identity_response = client.get(OPENAPI_URL, headers={"Accept-Encoding": "identity"})
+
+    assert gzip_response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Encoding" not in identity_response.headers
+    assert gzip_response.headers["ETag"] != identity_response.headers["ETag"]
+
+    # each etag only revalidates the representation it was served with
+    headers = {"Accept-Encoding": "identity", "If-None-Match": identity_response.headers["ETag"]}
+    assert client.get(OPENAPI_URL, headers=headers).status_code == 304
+    headers = {"Accept-Encoding": "identity", "If-None-Match": gzip_response.headers["ETag"]}
+    assert client.get(OPENAPI_URL, headers=headers).status_code == 200
+    headers = {"Accept-Encoding": "gzip", "If-None-Match": f'W/{gzip_response.headers["ETag"]}'}
+    assert client.get(OPENAPI_URL, headers=headers).status_code == 304
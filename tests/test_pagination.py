@@ -0,0 +1,45 @@
+from datetime import datetime
+import pytest
+
+from app.common.configuration import config
+from app.common.constants import CountStrategy
+from app.common.pagination import decode_cursor, encode_cursor, get_count_strategy
+from app.exceptions.database_exceptions import DbException
+from app.models.db.schema import User
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30)
+    cursor = encode_cursor("created_at", "desc", created_at, 42, "john")
+
+    assert decode_cursor(cursor, "created_at", "desc", User.created_at, "john") == (created_at, 42)
+
+
+@pytest.mark.parametrize("sort_column, sort_dir, query", [
+    ("email", "desc", "john"),
+    ("created_at", "asc", "john"),
+    ("created_at", "desc", "jane"),
+    ("created_at", "desc", ""),
+])
+def test_cursor_is_rejected_for_another_listing(sort_column, sort_dir, query):
+    cursor = encode_cursor("created_at", "desc", datetime(2024, 5, 1), 42, "john")
+
+    with pytest.raises(DbException):
+        decode_cursor(cursor, sort_column, sort_dir, User.created_at, query)
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", encode_cursor("id", "asc", 1, 1)[:-4]])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(DbException):
+        decode_cursor(cursor, "id", "asc", User.id)
+
+
+def test_count_strategy(monkeypatch):
+    monkeypatch.setattr(config, "PAGINATION_COUNT_STRATEGY", "estimated")
+
+    assert get_count_strategy("cached") == CountStrategy.CACHED
+    assert get_count_strategy(CountStrategy.EXACT, cursor="abc") == CountStrategy.EXACT
+    assert get_count_strategy(None, cursor="abc") == CountStrategy.NONE
+    assert get_count_strategy(None) == CountStrategy.ESTIMATED
+    with pytest.raises(ValueError):
+        get_count_strategy("approximate")
@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.common.auth import permission_index as permission_index_module, token
+from app.common.auth.permission_index import RolePermissionIndex
+
+
+class ReloadingIndex(RolePermissionIndex):
+    """Reloads from the given tables instead of the database."""
+
+    def __init__(self, permission_ids: dict[str, int], role_masks: dict[int, int]) -> None:
+        super().__init__()
+        self.tables = (permission_ids, role_masks)
+        self.reloads = 0
+
+    async def reload(self):
+        self.reloads += 1
+        self.permission_ids, self.role_masks = self.tables
+        self.loaded = True
+
+
+def get_request(role_id: int, permissions: int = 0) -> Request:
+    request = Request({"type": "http", "headers": []})
+    request.state.user = {"id": 1, "role_id": role_id, "permissions": permissions}
+    return request
+
+
+@token.validate_permissions(allowed_permissions=["read_user"])
+async def read_user(request: Request):
+    return "ok"
+
+
+def test_role_created_on_another_worker_reloads_the_index(monkeypatch):
+    index = ReloadingIndex({"read_user": 3}, {7: 1 << 3})
+    index.loaded = True
+    monkeypatch.setattr(token, "permission_index", index)
+
+    assert asyncio.run(read_user(get_request(role_id=7))) == "ok"
+    assert index.reloads == 1
+    # known now, no more reloads
+    assert asyncio.run(read_user(get_request(role_id=7))) == "ok"
+    assert index.reloads == 1
+
+
+def test_misses_reload_at_most_every_interval(monkeypatch):
+    index = ReloadingIndex({"read_user": 3}, {7: 0})
+    monkeypatch.setattr(token, "permission_index", index)
+
+    async def unknown_role_requests():
+        for _ in range(5):
+            with pytest.raises(HTTPException) as ex:
+                await read_user(get_request(role_id=8))
+            assert ex.value.status_code == 401
+
+    asyncio.run(unknown_role_requests())
+    assert index.reloads == 1
+
+    monkeypatch.setattr(permission_index_module, "RELOAD_ON_MISS_INTERVAL", 0)
+    asyncio.run(unknown_role_requests())
+    assert index.reloads == 6
+
+
+def test_unloaded_index_is_unavailable_not_forbidden(monkeypatch):
+    index = RolePermissionIndex()
+
+    async def reload():
+        raise ConnectionError("database is down")
+
+    monkeypatch.setattr(index, "reload", reload)
+    monkeypatch.setattr(token, "permission_index", index)
+
+    with pytest.raises(HTTPException) as ex:
+        asyncio.run(read_user(get_request(role_id=7, permissions=1 << 3)))
+    assert ex.value.status_code == 503
@@ -0,0 +1,21 @@
+import asyncio
+import os
+
+from app.connectors.db.explain_check import explain_check
+from app.connectors.db.postgres import engine
+
+# run against a database holding a production sized dataset, e.g. from `python manage.py generate-data`
+MIN_ROWS = int(os.environ.get("EXPLAIN_CHECK_MIN_ROWS", 10000))
+
+
+def test_service_queries_do_not_scan_large_tables_sequentially(database):
+    async def check():
+        try:
+            return await explain_check(min_rows=MIN_ROWS, analyze=True)
+        finally:
+            await engine.dispose()
+
+    plans, failures = asyncio.run(check())
+
+    assert plans
+    assert not failures, "\n".join(failures)
@@ -0,0 +1,152 @@
+import asyncio
+import time
+import tracemalloc
+import uuid
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.common.auth import token
+from app.common.auth.revocation import revoked_tokens
+from app.common.auth.token_cache import token_cache
+from app.common.configuration import config
+from app.middlewares.rate_limit_policies import RateLimitKey, RateLimitPolicy
+from app.middlewares.rate_limiter import InMemoryRateLimitBackend, RateLimiterMiddleware
+
+DISTINCT_CLIENTS = 1_000_000
+
+
+def get_ip(index: int) -> str:
+    return f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}:{index >> 24}"
+
+
+async def hit_clients(backend: InMemoryRateLimitBackend, start: int, stop: int, current_time: float):
+    for index in range(start, stop):
+        await backend.hit(get_ip(index), current_time)
+
+
+def test_memory_stays_flat_under_a_million_distinct_clients(monkeypatch):
+    monkeypatch.setattr(config, "RATE_LIMIT_MAX_TRACKED_KEYS", 10_000)
+    backend = InMemoryRateLimitBackend(max_requests=10, time_window=60)
+    halfway = DISTINCT_CLIENTS // 2
+
+    tracemalloc.start()
+    try:
+        # every client is new and inside the same window, so only the cap can drop entries
+        asyncio.run(hit_clients(backend, 0, halfway, current_time=1000.0))
+        memory_halfway, _ = tracemalloc.get_traced_memory()
+
+        asyncio.run(hit_clients(backend, halfway, DISTINCT_CLIENTS, current_time=1000.0))
+        memory_after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(backend.requests) == config.RATE_LIMIT_MAX_TRACKED_KEYS
+    # another half a million clients did not cost anything on top
+    assert memory_after - memory_halfway < 64 * 1024
+    # and what is held is in the order of the tracked keys, not of the clients seen
+    assert memory_after < config.RATE_LIMIT_MAX_TRACKED_KEYS * 1024
+    # clients were dropped to make room, the latest one is tracked
+    assert get_ip(0) not in backend.requests
+    assert get_ip(DISTINCT_CLIENTS - 1) in backend.requests
+
+
+def test_idle_clients_are_evicted():
+    # one request every 6 seconds, a client that hit once has a full bucket again 6 seconds later
+    backend = InMemoryRateLimitBackend(max_requests=10, time_window=60, max_tracked_keys=1000)
+
+    asyncio.run(hit_clients(backend, 0, 100, current_time=0.0))
+    assert len(backend.requests) == 100
+
+    # their buckets are still refilling
+    asyncio.run(backend.hit("active", 3.0))
+    assert len(backend.requests) == 101
+
+    # full again, the same as never seen
+    asyncio.run(backend.hit("active", 6.5))
+    assert list(backend.requests) == ["active"]
+
+
+def test_busy_client_does_not_hold_back_eviction():
+    backend = InMemoryRateLimitBackend(max_requests=10, time_window=60, burst=20, max_tracked_keys=1000)
+
+    # the first client seen spends its whole bucket, it is full again only at 180
+    for _ in range(30):
+        asyncio.run(backend.hit("busy", 0.0))
+    asyncio.run(hit_clients(backend, 0, 100, current_time=1.0))
+
+    # the clients seen after it are full again at 7
+    asyncio.run(backend.hit("active", 10.0))
+    assert sorted(backend.requests) == ["active", "busy"]
+
+
+def test_evicted_client_starts_with_a_full_bucket():
+    backend = InMemoryRateLimitBackend(max_requests=2, time_window=60, max_tracked_keys=1000)
+
+    assert asyncio.run(backend.hit("client", 0.0)).allowed
+    assert asyncio.run(backend.hit("client", 1.0)).allowed
+    assert not asyncio.run(backend.hit("client", 2.0)).allowed
+
+    assert asyncio.run(backend.hit("client", 200.0)).allowed
+
+
+def test_burst_is_refilled_at_the_sustained_rate():
+    # 10 requests a minute sustained, 5 more at once for a client with a full bucket
+    backend = InMemoryRateLimitBackend(max_requests=10, time_window=60, burst=5, max_tracked_keys=1000)
+
+    results = [asyncio.run(backend.hit("client", 0.0)) for _ in range(16)]
+    assert [result.allowed for result in results] == [True] * 15 + [False]
+    assert results[0].remaining == 14
+    assert results[-1].retry_after == 6.0
+
+    # a window later only the sustained rate came back, not max_requests + burst
+    results = [asyncio.run(backend.hit("client", 60.0)) for _ in range(11)]
+    assert [result.allowed for result in results] == [True] * 10 + [False]
+
+
+def get_user_rate_limited_client(monkeypatch) -> TestClient:
+    async def is_revoked_in_redis(key, payload):
+        return False
+
+    monkeypatch.setattr(token, "is_revoked_in_redis", is_revoked_in_redis)
+
+    @token.authenticate
+    async def me(request: Request):
+        return JSONResponse(request.state.user)
+
+    app = Starlette(routes=[Route("/api/me", me)])
+    app.add_middleware(
+        RateLimiterMiddleware,
+        policies=[RateLimitPolicy(path_prefix="/api", max_requests=2, time_window=60, key_by=RateLimitKey.USER)],
+    )
+    return TestClient(app)
+
+
+def get_token(user_id: int) -> str:
+    issued_at = int(time.time())
+    return token.encrypt_token({"sub": str(user_id), "iat": issued_at, "exp": issued_at + 60, "jti": uuid.uuid4().hex, "role": 1, "perms": 1})
+
+
+def test_user_key_decodes_the_token_once(monkeypatch):
+    client = get_user_rate_limited_client(monkeypatch)
+    decodes = []
+    decode_jwt_token = token.decode_jwt_token
+    monkeypatch.setattr(token, "decode_jwt_token", lambda value: decodes.append(value) or decode_jwt_token(value))
+
+    response = client.get("/api/me", headers={"Authorization": f"Bearer {get_token(1)}"})
+    assert response.status_code == 200
+    assert response.json()["id"] == 1
+    assert len(decodes) == 1
+
+
+def test_revoked_token_is_limited_by_ip(monkeypatch):
+    client = get_user_rate_limited_client(monkeypatch)
+    revoked_token = get_token(2)
+    revoked_tokens.add(token_cache.digest(revoked_token), time.time() + 60)
+
+    # counted against the ip, the bucket of the user is still full
+    for _ in range(2):
+        assert client.get("/api/me", headers={"Authorization": f"Bearer {revoked_token}"}).status_code == 401
+    assert client.get("/api/me", headers={"Authorization": f"Bearer {get_token(2)}"}).status_code == 200
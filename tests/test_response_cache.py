@@ -0,0 +1,119 @@
+import asyncio
+from contextlib import asynccontextmanager
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app.common.cache import response_cache
+from app.common.cache.response_cache import (
+    CachedResponse, cached_response, deserialize_cached_response, etag_matches, get_etag, invalidate_tags,
+    local_response_cache, serialize_cached_response, write_cached_response,
+)
+
+
+class FakeRedisPipeline:
+    def __init__(self, redis_connector: "FakeRedisConnector") -> None:
+        self.redis_connector = redis_connector
+
+    def write(self, key, value, ttl=None, encrypt=True):
+        self.redis_connector.values[key] = value
+
+    def add_to_set(self, key, *members, ttl=None):
+        self.redis_connector.values.setdefault(key, set()).update(members)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.redis_connector.values.pop(key, None)
+
+    def publish(self, channel, message):
+        self.redis_connector.published.append((channel, message))
+
+
+class FakeRedisConnector:
+    """The part of RedisConnector the response cache uses, in a dict."""
+
+    def __init__(self) -> None:
+        self.values = {}
+        self.published = []
+
+    async def read(self, key, encrypted=True):
+        return self.values.get(key)
+
+    async def get_set_union(self, keys):
+        return sorted(set().union(*[self.values.get(key, set()) for key in keys]))
+
+    @asynccontextmanager
+    async def pipeline(self, transaction=False):
+        yield FakeRedisPipeline(self)
+
+
+@pytest.fixture
+def redis_connector(monkeypatch) -> FakeRedisConnector:
+    redis_connector = FakeRedisConnector()
+    monkeypatch.setattr(response_cache, "get_redis_connector", lambda: redis_connector)
+    local_response_cache.clear()
+    yield redis_connector
+    local_response_cache.clear()
+
+
+@pytest.mark.parametrize("if_none_match, expected", [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"xyz", "abc"', True),
+    ("*", True),
+    ('"xyz"', False),
+    ('"ab"', False),
+    ("", False),
+    (None, False),
+])
+def test_etag_matches(if_none_match, expected):
+    assert etag_matches(if_none_match, '"abc"') is expected
+
+
+def test_binary_body_round_trip():
+    response = CachedResponse(body=b"\xff\xfe\n\x00", status_code=200, media_type="application/octet-stream", etag=get_etag(b"\xff\xfe\n\x00"))
+
+    cached, header = deserialize_cached_response(serialize_cached_response(response, ttl=60, tags=["users"]))
+    assert cached == response
+    assert header["tags"] == ["users"]
+
+
+def test_invalidate_tags_drops_tagged_responses_everywhere(redis_connector):
+    response = CachedResponse(body=b"[]", status_code=200, media_type="application/json", etag=get_etag(b"[]"))
+
+    async def scenario():
+        await write_cached_response("response:users", response, ttl=60, tags=["users"])
+        await write_cached_response("response:user-1", response, ttl=60, tags=["users", "user:1"])
+        await write_cached_response("response:roles", response, ttl=60, tags=["roles"])
+        await invalidate_tags(["user:1", "users"])
+
+    asyncio.run(scenario())
+
+    assert list(local_response_cache.entries) == ["response:roles"]
+    assert sorted(redis_connector.values) == ["response-tag:roles", "response:roles"]
+    assert redis_connector.published == [(response_cache.RESPONSE_CACHE_CHANNEL, {"tags": ["user:1", "users"]})]
+
+
+def test_cached_response_answers_revalidation_with_304(redis_connector):
+    calls = []
+    app = FastAPI()
+
+    @app.get("/items")
+    @cached_response(ttl=60, tags=["items"])
+    async def items(request: Request):
+        calls.append(1)
+        return JSONResponse([1, 2, 3])
+
+    client = TestClient(app)
+    response = client.get("/items")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    assert client.get("/items", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/items", headers={"If-None-Match": '"other"'}).json() == [1, 2, 3]
+    assert len(calls) == 1
+
+    asyncio.run(invalidate_tags(["items"]))
+    assert client.get("/items", headers={"If-None-Match": etag}).status_code == 304
+    assert len(calls) == 2
@@ -0,0 +1,8 @@
+from app.api.main import discover_api_routes, render_route_manifest, ROUTE_MANIFEST_PATH
+
+
+def test_route_manifest_is_current():
+    with open(ROUTE_MANIFEST_PATH) as f:
+        manifest = f.read()
+    assert manifest == render_route_manifest(discover_api_routes()), "app/api/routes.py is out of date, run `python manage.py routes`"
+
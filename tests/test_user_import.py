@@ -0,0 +1,93 @@
+import asyncio
+from contextlib import asynccontextmanager
+import pytest
+
+from app.services import user_import_service
+from app.services.user_import_service import (
+    MAX_LINE_BYTES, ImportRow, import_chunk, read_csv_rows, read_lines, read_ndjson_rows, validate_row,
+)
+from app.models.requests.schema import CreateUserRequest
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+async def as_stream(*pieces: bytes):
+    for piece in pieces:
+        yield piece
+
+
+def user(email: str, role_id: int = 1) -> dict:
+    return {"email": email, "password": "secret", "first_name": "John", "last_name": "Doe", "role_id": role_id}
+
+
+def test_lines_split_across_pieces():
+    lines = asyncio.run(collect(read_lines(as_stream(b"a\r\nb", b"c\n", b"d"))))
+    assert lines == [(1, "a"), (2, "bc"), (3, "d")]
+
+
+def test_oversized_line_is_rejected():
+    stream = as_stream(b"a\n", b"x" * (MAX_LINE_BYTES + 1))
+    with pytest.raises(ValueError, match="line 2 is longer"):
+        asyncio.run(collect(read_lines(stream)))
+
+
+def test_ndjson_rows():
+    stream = as_stream(b'{"email": "a@test.com"}\n\n{broken\n[1, 2]\n')
+    rows = asyncio.run(collect(read_ndjson_rows(read_lines(stream))))
+
+    assert rows[0] == ImportRow(1, {"email": "a@test.com"})
+    assert rows[1].line == 3 and rows[1].error.startswith("invalid json")
+    assert rows[2] == ImportRow(4, None, "expected a json object")
+
+
+def test_csv_rows():
+    stream = as_stream(b"email,password,first_name,last_name,role_id\n", b"a@test.com,secret,,Doe,1\n", b"b@test.com,secret\n")
+    rows = asyncio.run(collect(read_csv_rows(read_lines(stream))))
+
+    assert rows[0] == ImportRow(2, {"email": "a@test.com", "password": "secret", "first_name": None, "last_name": "Doe", "role_id": "1"})
+    assert rows[1] == ImportRow(3, None, "expected 5 columns, got 2")
+
+
+def test_validate_row():
+    assert isinstance(validate_row(ImportRow(1, user("a@test.com")), {1}), CreateUserRequest)
+    assert validate_row(ImportRow(1, user("a@test.com", role_id=7)), {1}) == ["role_id : role 7 does not exist"]
+    assert validate_row(ImportRow(1, {**user("a@test.com"), "role_id": "admin"}), {1})[0].startswith("role_id :")
+    assert validate_row(ImportRow(1, None, "expected a json object"), {1}) == ["expected a json object"]
+
+
+def test_import_chunk_counts_duplicates_and_invalid_rows(monkeypatch):
+    existing_emails = {"taken@test.com"}
+
+    class Engine:
+        @asynccontextmanager
+        async def begin(self):
+            yield None
+
+    async def insert_users(connection, create_user_requests):
+        # ON CONFLICT (email) DO NOTHING, only the new emails get an id back
+        user_ids = []
+        for create_user_request in create_user_requests:
+            if create_user_request.email not in existing_emails:
+                existing_emails.add(create_user_request.email)
+                user_ids.append(len(existing_emails))
+        return user_ids
+
+    monkeypatch.setattr(user_import_service, "engine", Engine())
+    monkeypatch.setattr(user_import_service, "insert_users", insert_users)
+
+    rows = [
+        ImportRow(1, user("a@test.com")),
+        ImportRow(2, user("taken@test.com")),
+        ImportRow(3, user("b@test.com", role_id=7)),
+        ImportRow(4, None, "invalid json : Expecting value"),
+    ]
+    result = asyncio.run(import_chunk(1, rows, {1}))
+
+    assert (result.first_line, result.last_line, result.rows) == (1, 4, 4)
+    assert (result.imported, result.duplicates, result.invalid) == (1, 1, 2)
+    assert result.errors == [
+        {"line": 3, "errors": ["role_id : role 7 does not exist"]},
+        {"line": 4, "errors": ["invalid json : Expecting value"]},
+    ]
@@ -0,0 +1,68 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.common.constants import UserSignUpVerificationStatus, UserStatus
+from app.models.db.schema import User, UserSignUpVerification
+from app.models.requests.schema import LoginRequest
+from app.services import user_service
+
+
+class Result:
+    def __init__(self, row) -> None:
+        self.row = row
+
+    def all(self):
+        return [self.row]
+
+    def one(self):
+        return self.row
+
+
+class RecordingSession:
+    """Stands in for the AsyncSession, records the statements and answers them with rows in order."""
+
+    def __init__(self, *rows) -> None:
+        self.rows = list(rows)
+        self.statements = []
+
+    async def exec(self, statement):
+        self.statements.append(statement)
+        return Result(self.rows.pop(0))
+
+    async def commit(self):
+        pass
+
+    async def refresh(self, instance):
+        pass
+
+
+def get_conditions(statement) -> list[tuple[str, object]]:
+    """(column, bound value) of every condition the where clause ANDs together."""
+    return [(condition.left.name, condition.right.value) for condition in statement.whereclause.clauses]
+
+
+def test_login_user_matches_email_and_password():
+    user = User(id=1, email="user@example.com", password="secret", role_id=1)
+    db = RecordingSession(user)
+
+    assert asyncio.run(user_service.login_user(db, LoginRequest(email="user@example.com", password="secret"))) is user
+    assert get_conditions(db.statements[0]) == [("email", "user@example.com"), ("password", "secret")]
+
+
+def test_verify_user_sign_up_matches_user_and_verification_code(monkeypatch):
+    async def invalidate_tags(tags):
+        pass
+
+    monkeypatch.setattr(user_service, "invalidate_tags", invalidate_tags)
+    verification = UserSignUpVerification(
+        user_id=1,
+        verification_code="code",
+        status=UserSignUpVerificationStatus.PENDING,
+        expires_at=datetime.now() + timedelta(minutes=10),
+    )
+    user = User(id=1, email="user@example.com", status=UserStatus.CREATED, role_id=1)
+    db = RecordingSession(verification, user)
+
+    assert asyncio.run(user_service.verify_user_sign_up(db, user_id=1, verification_code="code")) is user
+    assert get_conditions(db.statements[0]) == [("user_id", 1), ("verification_code", "code")]
+    assert verification.status == UserSignUpVerificationStatus.VERIFIED